@@ -0,0 +1,24 @@
+"""GIN index on recipes.tags
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Backs the `tags @> ARRAY[...]` containment filter in list_recipes.
+    op.create_index("ix_recipes_tags", "recipes", ["tags"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recipes_tags", table_name="recipes")
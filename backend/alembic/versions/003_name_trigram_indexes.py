@@ -0,0 +1,37 @@
+"""Trigram indexes on item, recipe and tool names
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TRGM_INDEXES = (
+    ("ix_pantry_items_name_trgm", "pantry_items"),
+    ("ix_recipes_name_trgm", "recipes"),
+    ("ix_kitchen_tools_name_trgm", "kitchen_tools"),
+)
+
+
+def upgrade() -> None:
+    # Lets the planner use an index for the `name ILIKE '%term%'` search
+    # filters in the pantry, recipe and tool list endpoints.
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table in _TRGM_INDEXES:
+        op.create_index(
+            name, table, ["name"],
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    for name, table in _TRGM_INDEXES:
+        op.drop_index(name, table_name=table)
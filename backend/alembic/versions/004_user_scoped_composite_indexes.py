@@ -0,0 +1,37 @@
+"""Composite user-scoped indexes on pantry_items and recipes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 00:00:00.000000
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # See the endpoint -> index mapping in app/models/pantry.py and recipe.py.
+    op.create_index("ix_pantry_user_freshness", "pantry_items", ["user_id", "freshness_status"])
+    op.create_index("ix_pantry_user_exp", "pantry_items", ["user_id", "expiration_date"])
+    op.create_index("ix_pantry_user_fresh_exp", "pantry_items", ["user_id", "freshness_expires_at"])
+    op.create_index(
+        "ix_pantry_user_min_qty", "pantry_items", ["user_id"],
+        postgresql_where=sa.text("min_quantity IS NOT NULL"),
+    )
+    op.create_index("ix_pantry_user_canonical", "pantry_items", ["user_id", "canonical_name"])
+    op.create_index("ix_recipe_user_name", "recipes", ["user_id", "name"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_recipe_user_name", table_name="recipes")
+    op.drop_index("ix_pantry_user_canonical", table_name="pantry_items")
+    op.drop_index("ix_pantry_user_min_qty", table_name="pantry_items")
+    op.drop_index("ix_pantry_user_fresh_exp", table_name="pantry_items")
+    op.drop_index("ix_pantry_user_exp", table_name="pantry_items")
+    op.drop_index("ix_pantry_user_freshness", table_name="pantry_items")
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import create_engine, Column, DateTime
+from sqlalchemy import DDL, create_engine, Column, DateTime, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
@@ -22,7 +22,12 @@ _is_cloud = "supabase" in _db_url or "neon.tech" in _db_url or "pooler" in _db_u
 if _is_cloud and "sslmode" not in _db_url:
     _db_url += ("&" if "?" in _db_url else "?") + "sslmode=require"
 
-engine = create_engine(_db_url)
+engine = create_engine(
+    _db_url,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -30,6 +35,15 @@ class Base(DeclarativeBase):
     pass
 
 
+# The name trigram indexes use gin_trgm_ops, which create_all can't build
+# until pg_trgm exists (the Alembic migration creates it the same way)
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class BaseMixin:
     """Adds UUID primary key and timestamps to all models."""
 
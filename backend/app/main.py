@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
 from app.routers import auth, pantry, tools, recipes, collections, meal_plans, grocery, ai, import_export
+from app.services.kitchen_ai import get_kitchen_ai
 
 settings = get_settings()
 
@@ -49,3 +50,13 @@ def health():
 @app.on_event("startup")
 def startup():
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    # Build the shared KitchenAI instance up front so the first AI request doesn't pay for it
+    get_kitchen_ai()
+    # Pydantic validators are already built at import; the OpenAPI schema is the
+    # part FastAPI generates lazily, on the first /docs or /openapi.json hit
+    app.openapi()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await get_kitchen_ai().aclose()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Date, Boolean, Text, ForeignKey
+from sqlalchemy import Column, String, Float, Date, Boolean, Text, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -29,3 +29,19 @@ class PantryItem(BaseMixin, Base):
     notes = Column(Text)
 
     user = relationship("User", back_populates="pantry_items")
+
+    # Every pantry query is scoped to one user, so secondary filters are
+    # indexed together with user_id:
+    #   GET /pantry/?freshness_status=, /freshness-dashboard  -> ix_pantry_user_freshness
+    #   GET /pantry/expiring                                  -> ix_pantry_user_exp + ix_pantry_user_fresh_exp
+    #   GET /pantry/low-stock                                 -> ix_pantry_user_min_qty
+    #   pantry matching by canonical_name (meal plans, thaw reminders) -> ix_pantry_user_canonical
+    #   GET /pantry/?search=                                  -> ix_pantry_items_name_trgm
+    __table_args__ = (
+        Index("ix_pantry_user_freshness", "user_id", "freshness_status"),
+        Index("ix_pantry_user_exp", "user_id", "expiration_date"),
+        Index("ix_pantry_user_fresh_exp", "user_id", "freshness_expires_at"),
+        Index("ix_pantry_user_min_qty", "user_id", postgresql_where=text("min_quantity IS NOT NULL")),
+        Index("ix_pantry_user_canonical", "user_id", "canonical_name"),
+        Index("ix_pantry_items_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
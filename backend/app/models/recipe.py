@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Date, Boolean, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Date, Boolean, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from sqlalchemy.orm import relationship
 
@@ -38,6 +38,15 @@ class Recipe(BaseMixin, Base):
     cook_logs = relationship("CookLog", back_populates="recipe", cascade="all, delete-orphan")
     parent_recipe = relationship("Recipe", remote_side="Recipe.id", backref="child_versions")
 
+    # GET /recipes/ (default sort by name)  -> ix_recipe_user_name
+    # GET /recipes/?tags=                   -> ix_recipes_tags
+    # GET /recipes/?search=                 -> ix_recipes_name_trgm
+    __table_args__ = (
+        Index("ix_recipe_user_name", "user_id", "name"),
+        Index("ix_recipes_tags", "tags", postgresql_using="gin"),
+        Index("ix_recipes_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
 
 class RecipeIngredient(BaseMixin, Base):
     __tablename__ = "recipe_ingredients"
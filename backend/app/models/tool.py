@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Date, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Date, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
 
@@ -25,6 +25,10 @@ class KitchenTool(BaseMixin, Base):
     user = relationship("User", back_populates="kitchen_tools")
     consumables = relationship("ToolConsumable", back_populates="tool", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_kitchen_tools_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
 
 class ToolConsumable(BaseMixin, Base):
     __tablename__ = "tool_consumables"
@@ -3,6 +3,7 @@ AI Router — all AI-powered endpoints for Phase 4.
 
 Endpoints:
   POST /what-can-i-make — recipe suggestions from current pantry
+  POST /what-can-i-make/stream — same, streamed as NDJSON one suggestion at a time
   POST /freshness-check — batch freshness assessment
   POST /substitutions — find substitutes for missing ingredient
   POST /waste-analysis — waste patterns and suggestions
@@ -10,6 +11,7 @@ Endpoints:
   POST /pantry-forecast — projected pantry after planned meals
   POST /smart-suggestions — contextual suggestions
   POST /freshness-scan — trigger full freshness scan
+  GET  /freshness-scan/{task_id} — poll a queued freshness scan
   GET  /notifications — get user notifications
   POST /notifications/mark-read — mark notification as read
   POST /notifications/mark-all-read — mark all notifications as read
@@ -17,9 +19,12 @@ Endpoints:
 
 from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+import msgspec
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
 
+from app.config import get_settings
 from app.database import get_db
 from app.models.pantry import PantryItem
 from app.models.recipe import Recipe, RecipeIngredient
@@ -34,17 +39,15 @@ from app.schemas.waste import (
     PantryForecastRequest,
     FreshnessScanRequest,
 )
-from app.services.kitchen_ai import get_kitchen_ai, KitchenAI
 from app.services.freshness import run_freshness_scan
+from app.services.kitchen_ai import get_kitchen_ai, KitchenAI
 from app.services.waste_analytics import get_waste_summary, get_waste_trend
 from app.services.notifications import (
     get_notifications,
     mark_read,
     mark_all_read,
-    generate_freshness_alerts,
-    generate_low_stock_alerts,
-    generate_thaw_reminders,
 )
+from app.tasks import freshness_scan as scan_tasks
 from app.utils.auth import get_current_user
 
 router = APIRouter()
@@ -54,16 +57,14 @@ def _get_ai() -> KitchenAI:
     return get_kitchen_ai()
 
 
-# ── What Can I Make ──────────────────────────────────────────────
+def _background_scans_enabled() -> bool:
+    return get_settings().CELERY_ENABLED and scan_tasks.celery_app is not None
 
-@router.post("/what-can-i-make")
-async def what_can_i_make(
-    body: WhatCanIMakeRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    ai = _get_ai()
 
+# ── What Can I Make ──────────────────────────────────────────────
+
+def _what_can_i_make_inputs(body: WhatCanIMakeRequest, db: Session, current_user: User) -> dict:
+    """Keyword arguments for KitchenAI.what_can_i_make / stream_what_can_i_make."""
     pantry = db.query(PantryItem).filter(
         PantryItem.user_id == current_user.id,
     ).all()
@@ -88,19 +89,46 @@ async def what_can_i_make(
         for t in tools
     ]
 
-    suggestions = await ai.what_can_i_make(
-        pantry=pantry_data,
-        tools=tools_data,
-        preferences={
+    return {
+        "pantry": pantry_data,
+        "tools": tools_data,
+        "preferences": {
             "dietary_restrictions": body.dietary_restrictions,
             "max_time_minutes": body.max_time_minutes,
             "preferred_cuisine": body.preferred_cuisine,
             "meal_type": body.meal_type,
         },
-    )
+    }
+
+
+@router.post("/what-can-i-make")
+async def what_can_i_make(
+    body: WhatCanIMakeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    ai = _get_ai()
+    suggestions = await ai.what_can_i_make(**_what_can_i_make_inputs(body, db, current_user))
     return {"suggestions": suggestions}
 
 
+@router.post("/what-can-i-make/stream")
+async def what_can_i_make_stream(
+    body: WhatCanIMakeRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    ai = _get_ai()
+    # Query before streaming starts; the generator never touches the session
+    inputs = _what_can_i_make_inputs(body, db, current_user)
+
+    async def ndjson():
+        async for suggestion in ai.stream_what_can_i_make(**inputs):
+            yield msgspec.json.encode(suggestion) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 # ── Freshness Check (batch) ──────────────────────────────────────
 
 @router.post("/freshness-check")
@@ -140,7 +168,10 @@ async def freshness_check(
         for i in items_with_dates
     ]
 
-    results = await ai.check_freshness_batch(items_data)
+    try:
+        results = await ai.check_freshness_batch(items_data)
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"Freshness check failed: {exc}") from exc
 
     # Update items in DB
     updated = 0
@@ -420,26 +451,42 @@ async def smart_suggestions(
 
 @router.post("/freshness-scan")
 async def freshness_scan(
+    background_tasks: BackgroundTasks,
     body: FreshnessScanRequest = FreshnessScanRequest(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    if _background_scans_enabled():
+        task = scan_tasks.celery_on_demand_scan.delay(str(current_user.id), body.force_ai)
+        # Accepted, not done: clients poll GET /freshness-scan/{task_id} before refetching
+        return JSONResponse(status_code=202, content={"task_id": task.id, "status": "queued"})
+
+    # No worker configured: scan in the request so the dashboard refetch sees
+    # the new statuses, and generate notifications after the response is sent
     ai = _get_ai() if body.force_ai else None
-    result = await run_freshness_scan(db, current_user.id, ai=ai)
+    scan_result = await run_freshness_scan(db, current_user.id, ai=ai)
+    background_tasks.add_task(scan_tasks.generate_scan_notifications, current_user.id)
+    # Counts aren't known until the background task runs, so they're null
+    # rather than zeros a client could mistake for "no alerts"
+    return {"scan": scan_result, "notifications_generated": None, "notifications": "scheduled"}
 
-    # Also generate notifications
-    freshness_alerts = generate_freshness_alerts(db, current_user.id)
-    low_stock_alerts = generate_low_stock_alerts(db, current_user.id)
-    thaw_reminders = generate_thaw_reminders(db, current_user.id)
 
-    return {
-        "scan": result,
-        "notifications_generated": {
-            "freshness": len(freshness_alerts),
-            "low_stock": len(low_stock_alerts),
-            "thaw": len(thaw_reminders),
-        },
-    }
+@router.get("/freshness-scan/{task_id}")
+def freshness_scan_status(
+    task_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    if not _background_scans_enabled():
+        raise HTTPException(status_code=404, detail="Background scans are not enabled")
+    task = scan_tasks.celery_app.AsyncResult(task_id)
+    if not task.ready():
+        return {"task_id": task_id, "status": task.status.lower()}
+    if task.failed():
+        return {"task_id": task_id, "status": "failure"}
+    result = task.result
+    if result.get("user_id") != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Scan not found")
+    return {"task_id": task_id, "status": "success", "result": result}
 
 
 # ── Notifications ────────────────────────────────────────────────
@@ -17,6 +17,7 @@ from app.models.user import User
 from app.models.pantry import PantryItem
 from app.models.tool import KitchenTool
 from app.models.recipe import Recipe, RecipeIngredient, RecipeTool
+from app.schemas.recipe import clean_instructions
 from app.utils.auth import get_current_user
 from app.services.kitchen_ai import get_kitchen_ai
 
@@ -406,7 +407,7 @@ async def import_google_doc(
                 prep_time_minutes=recipe_data.get("prep_time_minutes"),
                 cook_time_minutes=recipe_data.get("cook_time_minutes"),
                 total_time_minutes=recipe_data.get("total_time_minutes"),
-                instructions=recipe_data.get("instructions"),
+                instructions=clean_instructions(recipe_data.get("instructions")),
                 cuisine=recipe_data.get("cuisine"),
                 difficulty=recipe_data.get("difficulty"),
                 tags=recipe_data.get("tags", []),
@@ -129,7 +129,7 @@ async def generate_plan(
         db.refresh(mp)
     return {
         "message": f"Generated {len(created)} meal plan entries",
-        "plans": [MealPlanResponse.model_validate(mp).model_dump() for mp in created],
+        "plans": [MealPlanResponse.from_orm_trusted(mp).model_dump() for mp in created],
     }
 
 
@@ -165,7 +165,7 @@ def prep_groups(
     groups: dict[str, list] = {}
     for p in plans:
         groups.setdefault(p.prep_day_group, []).append(
-            MealPlanResponse.model_validate(p).model_dump()
+            MealPlanResponse.from_orm_trusted(p).model_dump()
         )
     return {"groups": groups}
 
@@ -253,6 +253,6 @@ def complete_meal(
     db.commit()
     db.refresh(plan)
     return {
-        "plan": MealPlanResponse.model_validate(plan).model_dump(),
+        "plan": MealPlanResponse.from_orm_trusted(plan).model_dump(),
         "deductions": deductions,
     }
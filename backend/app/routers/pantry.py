@@ -1,23 +1,40 @@
 import re
 from datetime import date, timedelta, timezone, datetime
+from typing import Literal
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func, insert, update
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.pantry import PantryItem
 from app.models.waste import WasteLog
 from app.models.user import User
+from app.schemas._fast import PantryItemStruct, struct_columns
 from app.schemas.pantry import (
     PantryItemCreate, PantryItemUpdate, PantryItemResponse,
     AdjustQuantityRequest, WasteRequest,
 )
+from app.services.freshness import rule_based_freshness
 from app.utils.auth import get_current_user
-from app.utils.pagination import paginate
+from app.utils.pagination import paginate_structs, paginate_structs_keyset
 
 router = APIRouter()
 
+_PANTRY_LIST_COLUMNS = struct_columns(PantryItem, PantryItemStruct)
+
+_PANTRY_SORTABLE = {
+    "name": PantryItem.name,
+    "category": PantryItem.category,
+    "quantity": PantryItem.quantity,
+    "expiration_date": PantryItem.expiration_date,
+    "created_at": PantryItem.created_at,
+    "updated_at": PantryItem.updated_at,
+}
+# Declared as a Literal so FastAPI rejects other values with a 422 and lists them in the docs
+PantrySortField = Literal["name", "category", "quantity", "expiration_date", "created_at", "updated_at"]
+
 
 def make_canonical(name: str) -> str:
     """Generate canonical_name by lowercasing and stripping brand info in parens."""
@@ -35,6 +52,24 @@ def _get_item(db: Session, item_id: UUID, user_id) -> PantryItem:
     return item
 
 
+def _update_item_returning(db: Session, item_id: UUID, user_id, **values) -> PantryItemResponse:
+    """Apply `values` in one atomic UPDATE ... RETURNING scoped to the owner."""
+    stmt = (
+        update(PantryItem)
+        .where(PantryItem.id == item_id, PantryItem.user_id == user_id)
+        .values(**values, updated_at=datetime.now(timezone.utc))
+        .returning(PantryItem)
+        .execution_options(synchronize_session=False)
+    )
+    item = db.execute(stmt).scalar_one_or_none()
+    if not item:
+        raise HTTPException(status_code=404, detail="Pantry item not found")
+    # Serialize before commit so expiry doesn't force a reload
+    response = PantryItemResponse.from_orm_trusted(item)
+    db.commit()
+    return response
+
+
 @router.get("/", response_model=dict)
 def list_items(
     search: str | None = None,
@@ -42,14 +77,15 @@ def list_items(
     location: str | None = None,
     freshness_status: str | None = None,
     is_staple: bool | None = None,
-    sort_by: str = "name",
-    sort_dir: str = "asc",
+    sort_by: PantrySortField = "name",
+    sort_dir: Literal["asc", "desc"] = "asc",
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    q = db.query(PantryItem).filter(PantryItem.user_id == current_user.id)
+    q = db.query(*_PANTRY_LIST_COLUMNS).filter(PantryItem.user_id == current_user.id)
     if search:
         q = q.filter(PantryItem.name.ilike(f"%{search}%"))
     if category:
@@ -60,11 +96,13 @@ def list_items(
         q = q.filter(PantryItem.freshness_status == freshness_status)
     if is_staple is not None:
         q = q.filter(PantryItem.is_staple == is_staple)
-    sort_col = getattr(PantryItem, sort_by, PantryItem.name)
+    sort_col = _PANTRY_SORTABLE[sort_by]
+    if cursor is not None:
+        return paginate_structs_keyset(
+            q, sort_col, PantryItem.id, sort_dir == "desc", cursor, limit, PantryItemStruct,
+        )
     q = q.order_by(sort_col.desc() if sort_dir == "desc" else sort_col.asc())
-    result = paginate(q, skip, limit)
-    result["items"] = [PantryItemResponse.model_validate(i) for i in result["items"]]
-    return result
+    return paginate_structs(q, skip, limit, PantryItemStruct)
 
 
 @router.post("/", response_model=PantryItemResponse, status_code=201)
@@ -78,12 +116,39 @@ def create_item(
         user_id=current_user.id,
         canonical_name=make_canonical(body.name),
     )
+    [(item.freshness_status, item.freshness_expires_at)] = rule_based_freshness(db, [item])
     db.add(item)
     db.commit()
     db.refresh(item)
     return item
 
 
+@router.post("/bulk", response_model=dict, status_code=201)
+def create_items_bulk(
+    body: list[PantryItemCreate],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Create many pantry items in one request. Each gets its rule-based
+    freshness, as on single create, and all are written with one executemany
+    INSERT.
+    """
+    rows = [
+        {**item.model_dump(), "user_id": current_user.id, "canonical_name": make_canonical(item.name)}
+        for item in body
+    ]
+    # Unsaved PantryItems only carry the fields the freshness rules read
+    freshness = rule_based_freshness(db, [PantryItem(**row) for row in rows])
+    for row, (status, effective_exp) in zip(rows, freshness):
+        row["freshness_status"] = status
+        row["freshness_expires_at"] = effective_exp
+    if rows:
+        db.execute(insert(PantryItem), rows)
+        db.commit()
+    return {"created": len(rows)}
+
+
 @router.get("/expiring", response_model=list[PantryItemResponse])
 def expiring_items(
     days: int = Query(7, ge=1),
@@ -122,9 +187,9 @@ def freshness_dashboard(
     use_soon = base.filter(PantryItem.freshness_status == "use_soon").all()
     expired = base.filter(PantryItem.freshness_status == "expired").all()
     return {
-        "use_today": [PantryItemResponse.model_validate(i) for i in use_today],
-        "use_soon": [PantryItemResponse.model_validate(i) for i in use_soon],
-        "expired": [PantryItemResponse.model_validate(i) for i in expired],
+        "use_today": [PantryItemResponse.from_orm_trusted(i) for i in use_today],
+        "use_soon": [PantryItemResponse.from_orm_trusted(i) for i in use_soon],
+        "expired": [PantryItemResponse.from_orm_trusted(i) for i in expired],
         "counts": {
             "use_today": len(use_today),
             "use_soon": len(use_soon),
@@ -186,13 +251,10 @@ def adjust_quantity(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    item = _get_item(db, item_id, current_user.id)
-    current = item.quantity or 0
-    item.quantity = max(0, current + body.amount)
-    item.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(item)
-    return item
+    return _update_item_returning(
+        db, item_id, current_user.id,
+        quantity=func.greatest(0, func.coalesce(PantryItem.quantity, 0) + body.amount),
+    )
 
 
 @router.post("/{item_id}/open", response_model=PantryItemResponse)
@@ -201,14 +263,14 @@ def mark_opened(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    item = _get_item(db, item_id, current_user.id)
-    item.opened_date = date.today()
-    if item.freshness_status == "fresh":
-        item.freshness_status = "use_soon"
-    item.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(item)
-    return item
+    return _update_item_returning(
+        db, item_id, current_user.id,
+        opened_date=date.today(),
+        freshness_status=case(
+            (PantryItem.freshness_status == "fresh", "use_soon"),
+            else_=PantryItem.freshness_status,
+        ),
+    )
 
 
 @router.post("/{item_id}/waste", response_model=dict)
@@ -2,8 +2,12 @@ import re
 from datetime import datetime, timezone
 from uuid import UUID
 
+import msgspec
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, selectinload
 
 from app.database import get_db
 from app.models.recipe import (
@@ -13,6 +17,7 @@ from app.models.recipe import (
 from app.models.pantry import PantryItem
 from app.models.tool import KitchenTool
 from app.models.user import User
+from app.schemas._fast import RecipeListStruct, struct_columns
 from app.schemas.recipe import (
     RecipeCreate, RecipeUpdate, RecipeResponse, RecipeListResponse,
     CookLogCreate, CookLogResponse, ScaleRequest,
@@ -20,12 +25,26 @@ from app.schemas.recipe import (
     ParseURLRequest, ParseYouTubeRequest, ParseImageRequest,
     GenerateRecipeRequest, NormalizeIngredientRequest,
 )
-from app.services.kitchen_ai import get_kitchen_ai
+from app.services.kitchen_ai import KitchenAI, get_kitchen_ai
 from app.utils.auth import get_current_user
-from app.utils.pagination import paginate
+from app.utils.pagination import paginate_structs, paginate_structs_keyset
 
 router = APIRouter()
 
+# Only the columns the list view serializes — skips JSONB/text blobs and relationships.
+_RECIPE_LIST_COLUMNS = struct_columns(Recipe, RecipeListStruct)
+
+# Scaled ingredients keep the RecipeIngredientResponse shape without a validate/dump per row.
+_INGREDIENT_FIELDS = tuple(RecipeIngredientResponse.model_fields)
+
+_RECIPE_SORTABLE = {
+    "name": Recipe.name,
+    "rating": Recipe.rating,
+    "total_time_minutes": Recipe.total_time_minutes,
+    "created_at": Recipe.created_at,
+    "updated_at": Recipe.updated_at,
+}
+
 
 def _make_canonical(name: str) -> str:
     name = re.sub(r"\(.*?\)", "", name)
@@ -33,32 +52,66 @@ def _make_canonical(name: str) -> str:
     return name.strip().lower()
 
 
-def _get_recipe(db: Session, recipe_id: UUID, user_id) -> Recipe:
+def _json_response(payload) -> Response:
+    """Encode with msgspec, skipping jsonable_encoder's walk over large AI payloads."""
+    return Response(content=msgspec.json.encode(payload), media_type="application/json")
+
+
+def _get_recipe_full(db: Session, recipe_id: UUID, user_id) -> Recipe:
+    """Load a recipe with its ingredients and tools."""
     recipe = db.query(Recipe).options(
-        joinedload(Recipe.ingredients),
-        joinedload(Recipe.tools),
+        selectinload(Recipe.ingredients),
+        selectinload(Recipe.tools),
     ).filter(Recipe.id == recipe_id, Recipe.user_id == user_id).first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return recipe
 
 
-def _sync_ingredients(db: Session, recipe: Recipe, ingredients_data: list):
-    db.query(RecipeIngredient).filter(RecipeIngredient.recipe_id == recipe.id).delete()
-    for ing_data in ingredients_data:
-        ing = RecipeIngredient(
-            recipe_id=recipe.id,
+def _recipe_response(db: Session, recipe_id: UUID, user_id) -> RecipeResponse:
+    """Reload a recipe with its relations and build the response without re-validating columns."""
+    return RecipeResponse.from_orm_trusted(_get_recipe_full(db, recipe_id, user_id))
+
+
+def _get_recipe_bare(db: Session, recipe_id: UUID, user_id):
+    """Ownership check only — returns (id, parent_recipe_id) without loading relations."""
+    row = db.query(Recipe.id, Recipe.parent_recipe_id).filter(
+        Recipe.id == recipe_id, Recipe.user_id == user_id
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return row
+
+
+def _insert_ingredients(db: Session, recipe_id, ingredients_data: list):
+    """Insert all ingredient rows in a single executemany round-trip."""
+    rows = [
+        {
             **ing_data.model_dump(),
-            canonical_name=ing_data.canonical_name or _make_canonical(ing_data.ingredient_name),
-        )
-        db.add(ing)
+            "recipe_id": recipe_id,
+            "canonical_name": ing_data.canonical_name or _make_canonical(ing_data.ingredient_name),
+        }
+        for ing_data in ingredients_data
+    ]
+    if rows:
+        db.execute(insert(RecipeIngredient), rows)
+
+
+def _insert_tools(db: Session, recipe_id, tools_data: list):
+    """Insert all tool rows in a single executemany round-trip."""
+    rows = [{**tool_data.model_dump(), "recipe_id": recipe_id} for tool_data in tools_data]
+    if rows:
+        db.execute(insert(RecipeTool), rows)
+
+
+def _sync_ingredients(db: Session, recipe: Recipe, ingredients_data: list):
+    db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id == recipe.id))
+    _insert_ingredients(db, recipe.id, ingredients_data)
 
 
 def _sync_tools(db: Session, recipe: Recipe, tools_data: list):
-    db.query(RecipeTool).filter(RecipeTool.recipe_id == recipe.id).delete()
-    for tool_data in tools_data:
-        rt = RecipeTool(recipe_id=recipe.id, **tool_data.model_dump())
-        db.add(rt)
+    db.execute(delete(RecipeTool).where(RecipeTool.recipe_id == recipe.id))
+    _insert_tools(db, recipe.id, tools_data)
 
 
 @router.get("/", response_model=dict)
@@ -75,10 +128,11 @@ def list_recipes(
     sort_dir: str = "asc",
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    q = db.query(Recipe).filter(Recipe.user_id == current_user.id)
+    q = db.query(*_RECIPE_LIST_COLUMNS).filter(Recipe.user_id == current_user.id)
     if search:
         q = q.filter(Recipe.name.ilike(f"%{search}%"))
     if cuisine:
@@ -94,13 +148,18 @@ def list_recipes(
     if is_favorite is not None:
         q = q.filter(Recipe.is_favorite == is_favorite)
     if tags:
-        for tag in tags.split(","):
-            q = q.filter(Recipe.tags.any(tag.strip()))
-    sort_col = getattr(Recipe, sort_by, Recipe.name)
+        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+        if tag_list:
+            q = q.filter(Recipe.tags.contains(tag_list))
+    sort_col = _RECIPE_SORTABLE.get(sort_by)
+    if sort_col is None:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort_by}'")
+    if cursor is not None:
+        return paginate_structs_keyset(
+            q, sort_col, Recipe.id, sort_dir == "desc", cursor, limit, RecipeListStruct,
+        )
     q = q.order_by(sort_col.desc() if sort_dir == "desc" else sort_col.asc())
-    result = paginate(q, skip, limit)
-    result["items"] = [RecipeListResponse.model_validate(i) for i in result["items"]]
-    return result
+    return paginate_structs(q, skip, limit, RecipeListStruct)
 
 
 @router.post("/", response_model=RecipeResponse, status_code=201)
@@ -118,53 +177,65 @@ def create_recipe(
     recipe = Recipe(**recipe_data, user_id=current_user.id)
     db.add(recipe)
     db.flush()
-    for ing_data in body.ingredients:
-        ing = RecipeIngredient(
-            recipe_id=recipe.id,
-            **ing_data.model_dump(),
-            canonical_name=ing_data.canonical_name or _make_canonical(ing_data.ingredient_name),
-        )
-        db.add(ing)
-    for tool_data in body.tools:
-        rt = RecipeTool(recipe_id=recipe.id, **tool_data.model_dump())
-        db.add(rt)
+    _insert_ingredients(db, recipe.id, body.ingredients)
+    _insert_tools(db, recipe.id, body.tools)
     db.commit()
-    return _get_recipe(db, recipe.id, current_user.id)
+    return _recipe_response(db, recipe.id, current_user.id)
 
 
 @router.post("/parse/url", response_model=dict)
 async def parse_url(
     body: ParseURLRequest,
     current_user: User = Depends(get_current_user),
+    ai: KitchenAI = Depends(get_kitchen_ai),
 ):
-    ai = get_kitchen_ai()
     recipe_data = await ai.parse_recipe_url(body.url)
     recipe_data["source_type"] = "url"
     recipe_data["source_url"] = body.url
-    return {"recipe": recipe_data}
+    return _json_response({"recipe": recipe_data})
 
 
 @router.post("/parse/youtube", response_model=dict)
 async def parse_youtube(
     body: ParseYouTubeRequest,
     current_user: User = Depends(get_current_user),
+    ai: KitchenAI = Depends(get_kitchen_ai),
 ):
-    ai = get_kitchen_ai()
     recipe_data = await ai.parse_recipe_youtube(body.url)
     recipe_data["source_type"] = "youtube"
     recipe_data["source_url"] = body.url
-    return {"recipe": recipe_data}
+    return _json_response({"recipe": recipe_data})
 
 
 @router.post("/parse/image", response_model=dict)
 async def parse_image(
     body: ParseImageRequest,
     current_user: User = Depends(get_current_user),
+    ai: KitchenAI = Depends(get_kitchen_ai),
 ):
-    ai = get_kitchen_ai()
     recipe_data = await ai.parse_recipe_image(body.image_base64, body.media_type)
     recipe_data["source_type"] = "image"
-    return {"recipe": recipe_data}
+    return _json_response({"recipe": recipe_data})
+
+
+def _generation_context(db: Session, user_id) -> tuple[list[dict], list[dict]]:
+    # Both queries share one Session, which isn't thread-safe, so they run
+    # back to back in a single worker thread rather than concurrently.
+    pantry_rows = db.query(
+        PantryItem.name, PantryItem.quantity, PantryItem.unit, PantryItem.canonical_name,
+    ).filter(PantryItem.user_id == user_id).all()
+    pantry_list = [
+        {"name": name, "quantity": quantity, "unit": unit, "canonical_name": canonical}
+        for name, quantity, unit, canonical in pantry_rows
+    ]
+    tool_rows = db.query(KitchenTool.name, KitchenTool.capabilities).filter(
+        KitchenTool.user_id == user_id
+    ).all()
+    tools_list = [
+        {"name": name, "capabilities": capabilities or []}
+        for name, capabilities in tool_rows
+    ]
+    return pantry_list, tools_list
 
 
 @router.post("/generate", response_model=dict)
@@ -172,29 +243,16 @@ async def generate_recipe(
     body: GenerateRecipeRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    ai: KitchenAI = Depends(get_kitchen_ai),
 ):
-    pantry_items = db.query(PantryItem).filter(
-        PantryItem.user_id == current_user.id
-    ).all()
-    pantry_list = [
-        {"name": p.name, "quantity": p.quantity, "unit": p.unit, "canonical_name": p.canonical_name}
-        for p in pantry_items
-    ]
-    tools = db.query(KitchenTool).filter(
-        KitchenTool.user_id == current_user.id
-    ).all()
-    tools_list = [
-        {"name": t.name, "capabilities": t.capabilities or []}
-        for t in tools
-    ]
-    ai = get_kitchen_ai()
+    pantry_list, tools_list = await run_in_threadpool(_generation_context, db, current_user.id)
     recipe_data = await ai.generate_recipe(
         constraints=body.model_dump(),
         pantry=pantry_list,
         tools=tools_list,
     )
     recipe_data["source_type"] = "ai_generated"
-    return {"recipe": recipe_data}
+    return _json_response({"recipe": recipe_data})
 
 
 @router.post("/normalize-ingredient", response_model=dict)
@@ -202,15 +260,15 @@ async def normalize_ingredient(
     body: NormalizeIngredientRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    ai: KitchenAI = Depends(get_kitchen_ai),
 ):
-    pantry_items = db.query(PantryItem).filter(
+    pantry_rows = db.query(PantryItem.id, PantryItem.name, PantryItem.canonical_name).filter(
         PantryItem.user_id == current_user.id
     ).all()
     pantry_list = [
-        {"name": p.name, "canonical_name": p.canonical_name, "id": str(p.id)}
-        for p in pantry_items
+        {"name": name, "canonical_name": canonical, "id": str(item_id)}
+        for item_id, name, canonical in pantry_rows
     ]
-    ai = get_kitchen_ai()
     result = await ai.normalize_ingredient(body.raw, pantry_list)
     return result
 
@@ -221,7 +279,7 @@ def get_recipe(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return _get_recipe(db, recipe_id, current_user.id)
+    return _recipe_response(db, recipe_id, current_user.id)
 
 
 @router.patch("/{recipe_id}", response_model=RecipeResponse)
@@ -231,7 +289,7 @@ def update_recipe(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    recipe = _get_recipe(db, recipe_id, current_user.id)
+    recipe = _get_recipe_full(db, recipe_id, current_user.id)
     data = body.model_dump(exclude_unset=True, exclude={"ingredients", "tools"})
     for k, v in data.items():
         setattr(recipe, k, v)
@@ -241,7 +299,7 @@ def update_recipe(
         _sync_tools(db, recipe, body.tools)
     recipe.updated_at = datetime.now(timezone.utc)
     db.commit()
-    return _get_recipe(db, recipe.id, current_user.id)
+    return _recipe_response(db, recipe.id, current_user.id)
 
 
 @router.delete("/{recipe_id}", status_code=204)
@@ -250,7 +308,7 @@ def delete_recipe(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    recipe = _get_recipe(db, recipe_id, current_user.id)
+    recipe = _get_recipe_full(db, recipe_id, current_user.id)
     db.delete(recipe)
     db.commit()
 
@@ -261,7 +319,7 @@ def create_version(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    original = _get_recipe(db, recipe_id, current_user.id)
+    original = _get_recipe_full(db, recipe_id, current_user.id)
     new_recipe = Recipe(
         user_id=current_user.id,
         name=original.name,
@@ -309,7 +367,7 @@ def create_version(
         )
         db.add(new_t)
     db.commit()
-    return _get_recipe(db, new_recipe.id, current_user.id)
+    return _recipe_response(db, new_recipe.id, current_user.id)
 
 
 @router.get("/{recipe_id}/history", response_model=list[RecipeListResponse])
@@ -318,7 +376,7 @@ def version_history(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    recipe = _get_recipe(db, recipe_id, current_user.id)
+    recipe = _get_recipe_bare(db, recipe_id, current_user.id)
     root_id = recipe.parent_recipe_id or recipe.id
     versions = db.query(Recipe).filter(
         Recipe.user_id == current_user.id,
@@ -334,7 +392,7 @@ def log_cook(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    _get_recipe(db, recipe_id, current_user.id)
+    _get_recipe_bare(db, recipe_id, current_user.id)
     log = CookLog(
         recipe_id=recipe_id,
         user_id=current_user.id,
@@ -352,7 +410,7 @@ def list_cook_logs(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    _get_recipe(db, recipe_id, current_user.id)
+    _get_recipe_bare(db, recipe_id, current_user.id)
     return db.query(CookLog).filter(
         CookLog.recipe_id == recipe_id,
         CookLog.user_id == current_user.id,
@@ -366,18 +424,19 @@ def scale_recipe(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    recipe = _get_recipe(db, recipe_id, current_user.id)
+    recipe = _get_recipe_full(db, recipe_id, current_user.id)
     ratio = body.servings / recipe.servings if recipe.servings else 1
     scaled_ingredients = []
     for ing in recipe.ingredients:
-        scaled = RecipeIngredientResponse.model_validate(ing).model_dump()
+        scaled = {f: getattr(ing, f) for f in _INGREDIENT_FIELDS}
         if scaled["quantity"]:
             scaled["quantity"] = round(scaled["quantity"] * ratio, 2)
         scaled_ingredients.append(scaled)
-    return {
+    payload = {
         "recipe_id": str(recipe.id),
         "original_servings": recipe.servings,
         "target_servings": body.servings,
         "ratio": round(ratio, 4),
         "scaled_ingredients": scaled_ingredients,
     }
+    return _json_response(payload)
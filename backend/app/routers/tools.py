@@ -7,16 +7,19 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.tool import KitchenTool, ToolConsumable
 from app.models.user import User
+from app.schemas._fast import KitchenToolStruct, struct_columns
 from app.schemas.tool import (
     KitchenToolCreate, KitchenToolUpdate, KitchenToolResponse,
     ToolConsumableCreate, ToolConsumableUpdate, ToolConsumableResponse,
     MaintenanceRequest,
 )
 from app.utils.auth import get_current_user
-from app.utils.pagination import paginate
+from app.utils.pagination import paginate_structs, paginate_structs_keyset
 
 router = APIRouter()
 
+_TOOL_LIST_COLUMNS = struct_columns(KitchenTool, KitchenToolStruct)
+
 
 def _get_tool(db: Session, tool_id: UUID, user_id) -> KitchenTool:
     tool = db.query(KitchenTool).filter(
@@ -33,18 +36,21 @@ def list_tools(
     category: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    q = db.query(KitchenTool).filter(KitchenTool.user_id == current_user.id)
+    q = db.query(*_TOOL_LIST_COLUMNS).filter(KitchenTool.user_id == current_user.id)
     if search:
         q = q.filter(KitchenTool.name.ilike(f"%{search}%"))
     if category:
         q = q.filter(KitchenTool.category == category)
+    if cursor is not None:
+        return paginate_structs_keyset(
+            q, KitchenTool.name, KitchenTool.id, False, cursor, limit, KitchenToolStruct,
+        )
     q = q.order_by(KitchenTool.name.asc())
-    result = paginate(q, skip, limit)
-    result["items"] = [KitchenToolResponse.model_validate(i) for i in result["items"]]
-    return result
+    return paginate_structs(q, skip, limit, KitchenToolStruct)
 
 
 @router.post("/", response_model=KitchenToolResponse, status_code=201)
@@ -0,0 +1,81 @@
+"""
+msgspec mirrors of hot read-only response schemas.
+
+List endpoints encode these directly with msgspec instead of going through
+Pydantic validation + jsonable_encoder. Field order matches the Pydantic
+response models so rows can be built positionally from column selects.
+The Pydantic models remain the source of truth for request validation and
+OpenAPI docs.
+"""
+
+from datetime import date, datetime
+from uuid import UUID
+
+import msgspec
+
+
+class PantryItemStruct(msgspec.Struct, gc=False):
+    id: UUID
+    user_id: UUID
+    name: str
+    canonical_name: str | None
+    category: str | None
+    subcategory: str | None
+    quantity: float | None
+    unit: str | None
+    location: str | None
+    brand: str | None
+    expiration_date: date | None
+    opened_date: date | None
+    purchase_date: date | None
+    freshness_status: str | None
+    freshness_expires_at: date | None
+    min_quantity: float | None
+    is_staple: bool | None
+    preferred_brand: str | None
+    batch_info: str | None
+    notes: str | None
+    created_at: datetime
+    updated_at: datetime
+
+
+class KitchenToolStruct(msgspec.Struct, gc=False):
+    id: UUID
+    user_id: UUID
+    name: str
+    category: str | None
+    brand: str | None
+    model: str | None
+    condition: str | None
+    location: str | None
+    purchase_date: date | None
+    capabilities: list[str] | None
+    last_maintained: date | None
+    maintenance_interval_days: int | None
+    maintenance_type: str | None
+    notes: str | None
+    created_at: datetime
+    updated_at: datetime
+
+
+class RecipeListStruct(msgspec.Struct, gc=False):
+    id: UUID
+    user_id: UUID
+    name: str
+    description: str | None
+    servings: int
+    total_time_minutes: int | None
+    tags: list[str]
+    cuisine: str | None
+    difficulty: str | None
+    dietary_flags: list[str]
+    rating: float | None
+    photo_url: str | None
+    is_favorite: bool
+    source_type: str | None
+    created_at: datetime
+
+
+def struct_columns(model, struct_type: type[msgspec.Struct]) -> tuple:
+    """ORM columns of `model` in the field order of `struct_type`."""
+    return tuple(getattr(model, f) for f in struct_type.__struct_fields__)
@@ -0,0 +1,42 @@
+import sys
+from operator import attrgetter
+from typing import Callable, ClassVar
+
+from pydantic import BaseModel
+
+
+class ORMResponse(BaseModel):
+    """
+    Base for response schemas built from SQLAlchemy rows.
+
+    `from_orm_trusted` skips validation: column types are already enforced by
+    the ORM, so the from_attributes validation pass is pure overhead on hot
+    read paths. Use `model_validate` for anything that isn't a database row.
+    Instances are frozen.
+    """
+
+    # Read models are never mutated or re-validated once built
+    model_config = {
+        "from_attributes": True,
+        "revalidate_instances": "never",
+        "validate_assignment": False,
+        "frozen": True,
+    }
+
+    # Interned field names and a single attrgetter over them, built once per subclass
+    _trusted_fields: ClassVar[tuple[str, ...]] = ()
+    _trusted_getter: ClassVar[Callable | None] = None
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs):
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._trusted_fields = tuple(sys.intern(f) for f in cls.model_fields)
+        cls._trusted_getter = attrgetter(*cls._trusted_fields)
+
+    @classmethod
+    def _trusted_values(cls, obj) -> dict:
+        return dict(zip(cls._trusted_fields, cls._trusted_getter(obj)))
+
+    @classmethod
+    def from_orm_trusted(cls, obj):
+        return cls.model_construct(**cls._trusted_values(obj))
@@ -2,6 +2,8 @@ from datetime import date, datetime
 from uuid import UUID
 from pydantic import BaseModel
 
+from app.schemas.base import ORMResponse
+
 
 class MealPlanCreate(BaseModel):
     plan_date: date
@@ -26,7 +28,7 @@ class MealPlanUpdate(BaseModel):
     sort_order: int | None = None
 
 
-class MealPlanResponse(BaseModel):
+class MealPlanResponse(ORMResponse):
     id: UUID
     user_id: UUID
     plan_date: date
@@ -45,8 +47,6 @@ class MealPlanResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
-
 
 class MealPlanWithRecipeName(MealPlanResponse):
     """Extended response that includes the recipe name for display."""
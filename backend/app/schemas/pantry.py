@@ -2,6 +2,8 @@ from datetime import date, datetime
 from uuid import UUID
 from pydantic import BaseModel
 
+from app.schemas.base import ORMResponse
+
 
 class PantryItemCreate(BaseModel):
     name: str
@@ -41,7 +43,7 @@ class PantryItemUpdate(BaseModel):
     notes: str | None = None
 
 
-class PantryItemResponse(BaseModel):
+class PantryItemResponse(ORMResponse):
     id: UUID
     user_id: UUID
     name: str
@@ -65,8 +67,6 @@ class PantryItemResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
-
 
 class AdjustQuantityRequest(BaseModel):
     amount: float
@@ -1,6 +1,8 @@
 from datetime import date, datetime
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, ValidationError, model_validator
+
+from app.schemas.base import ORMResponse
 
 
 class RecipeIngredientCreate(BaseModel):
@@ -16,7 +18,7 @@ class RecipeIngredientCreate(BaseModel):
     pantry_item_id: UUID | None = None
 
 
-class RecipeIngredientResponse(BaseModel):
+class RecipeIngredientResponse(ORMResponse):
     id: UUID
     recipe_id: UUID
     pantry_item_id: UUID | None
@@ -30,7 +32,53 @@ class RecipeIngredientResponse(BaseModel):
     optional: bool
     substitutions: str | None
 
-    model_config = {"from_attributes": True}
+
+class Instruction(BaseModel):
+    """One recipe step, as accepted on create/update."""
+    step: int
+    text: str
+    duration_minutes: int | None = None
+    technique: str | None = None
+
+
+class InstructionResponse(BaseModel):
+    """
+    One stored recipe step. recipes.instructions is free-form JSONB that may
+    predate Instruction validation, so reads accept whatever a step holds.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    step: int | str | None = None
+    text: str = ""
+    duration_minutes: int | None = None
+    technique: str | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _wrap_bare_text(cls, value):
+        return {"text": value} if isinstance(value, str) else value
+
+
+def clean_instructions(raw) -> list[dict] | None:
+    """
+    Coerce AI-produced instructions into Instruction-shaped dicts before they
+    are stored or handed to the client. Bare strings become steps, steps are
+    numbered by position, and steps without text are dropped.
+    """
+    if not isinstance(raw, list):
+        return None
+    steps = []
+    for item in raw:
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict) or not str(item.get("text") or "").strip():
+            continue
+        step = {**item, "text": str(item["text"]).strip(), "step": len(steps) + 1}
+        try:
+            steps.append(Instruction.model_validate(step).model_dump())
+        except ValidationError:
+            steps.append({"step": step["step"], "text": step["text"]})
+    return steps
 
 
 class RecipeToolCreate(BaseModel):
@@ -40,7 +88,7 @@ class RecipeToolCreate(BaseModel):
     notes: str | None = None
 
 
-class RecipeToolResponse(BaseModel):
+class RecipeToolResponse(ORMResponse):
     id: UUID
     recipe_id: UUID
     tool_id: UUID | None
@@ -48,8 +96,6 @@ class RecipeToolResponse(BaseModel):
     optional: bool
     notes: str | None
 
-    model_config = {"from_attributes": True}
-
 
 class RecipeCreate(BaseModel):
     name: str
@@ -58,7 +104,7 @@ class RecipeCreate(BaseModel):
     prep_time_minutes: int | None = None
     cook_time_minutes: int | None = None
     total_time_minutes: int | None = None
-    instructions: list[dict] | None = None
+    instructions: list[Instruction] | None = None
     source_type: str | None = None
     source_url: str | None = None
     source_attribution: str | None = None
@@ -78,7 +124,7 @@ class RecipeUpdate(BaseModel):
     prep_time_minutes: int | None = None
     cook_time_minutes: int | None = None
     total_time_minutes: int | None = None
-    instructions: list[dict] | None = None
+    instructions: list[Instruction] | None = None
     source_type: str | None = None
     source_url: str | None = None
     source_attribution: str | None = None
@@ -93,7 +139,7 @@ class RecipeUpdate(BaseModel):
     tools: list[RecipeToolCreate] | None = None
 
 
-class RecipeResponse(BaseModel):
+class RecipeResponse(ORMResponse):
     id: UUID
     user_id: UUID
     name: str
@@ -102,7 +148,7 @@ class RecipeResponse(BaseModel):
     prep_time_minutes: int | None
     cook_time_minutes: int | None
     total_time_minutes: int | None
-    instructions: list[dict] | None
+    instructions: list[InstructionResponse] | None
     source_type: str | None
     source_url: str | None
     source_attribution: str | None
@@ -123,10 +169,19 @@ class RecipeResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
+    @classmethod
+    def from_orm_trusted(cls, obj):
+        # Nested rows have to be constructed too, or serialization sees raw ORM objects
+        data = cls._trusted_values(obj)
+        if obj.instructions:
+            # Stored steps aren't guaranteed to be well-formed, so validate them tolerantly
+            data["instructions"] = [InstructionResponse.model_validate(step) for step in obj.instructions]
+        data["ingredients"] = [RecipeIngredientResponse.from_orm_trusted(i) for i in obj.ingredients]
+        data["tools"] = [RecipeToolResponse.from_orm_trusted(t) for t in obj.tools]
+        return cls.model_construct(**data)
 
 
-class RecipeListResponse(BaseModel):
+class RecipeListResponse(ORMResponse):
     """Lighter response for list views (no nested ingredients/tools)."""
     id: UUID
     user_id: UUID
@@ -144,8 +199,6 @@ class RecipeListResponse(BaseModel):
     source_type: str | None
     created_at: datetime
 
-    model_config = {"from_attributes": True}
-
 
 class CookLogCreate(BaseModel):
     cooked_date: date
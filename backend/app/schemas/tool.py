@@ -2,6 +2,8 @@ from datetime import date, datetime
 from uuid import UUID
 from pydantic import BaseModel
 
+from app.schemas.base import ORMResponse
+
 
 class KitchenToolCreate(BaseModel):
     name: str
@@ -32,7 +34,7 @@ class KitchenToolUpdate(BaseModel):
     notes: str | None = None
 
 
-class KitchenToolResponse(BaseModel):
+class KitchenToolResponse(ORMResponse):
     id: UUID
     user_id: UUID
     name: str
@@ -50,8 +52,6 @@ class KitchenToolResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
-
 
 class ToolConsumableCreate(BaseModel):
     consumable_name: str
@@ -1,9 +1,11 @@
 from datetime import date, datetime
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from app.schemas.base import ORMResponse
 
-class WasteLogResponse(BaseModel):
+
+class WasteLogResponse(ORMResponse):
     id: UUID
     user_id: UUID
     pantry_item_id: UUID | None
@@ -17,8 +19,6 @@ class WasteLogResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
-
 
 class WasteLogCreate(BaseModel):
     item_name: str
@@ -44,7 +44,7 @@ class SubstitutionRequest(BaseModel):
 
 
 class SeasonalRequest(BaseModel):
-    month: int | None = None  # defaults to current month
+    month: int | None = Field(None, ge=1, le=12)  # defaults to current month
 
 
 class PantryForecastRequest(BaseModel):
@@ -6,18 +6,27 @@ for items without known rules. Results are cached back to freshness_rules for
 future use.
 """
 
+import asyncio
+import logging
+import sys
 from datetime import date, timedelta
+from types import MappingProxyType
 
-from sqlalchemy.orm import Session
+from sqlalchemy import event, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, load_only
 
 from app.models.pantry import PantryItem
 from app.models.waste import FreshnessRule
 from app.services.kitchen_ai import KitchenAI
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 
 # ── Rule-based freshness defaults (no AI needed) ────────────────────
 
-DEFAULT_SHELF_LIFE = {
+_SHELF_LIFE_BY_CATEGORY = {
     # category -> (sealed_days, opened_days)
     "produce": (7, 4),
     "dairy": (14, 7),
@@ -37,158 +46,253 @@ DEFAULT_SHELF_LIFE = {
     "preserved": (365, 30),
     "alcohol": (730, 365),
 }
+# Read-only, with interned keys so interned lookups match by identity
+DEFAULT_SHELF_LIFE = MappingProxyType({sys.intern(k): v for k, v in _SHELF_LIFE_BY_CATEGORY.items()})
+_FALLBACK_SHELF_LIFE = (30, 14)
+_FROZEN_SHELF_LIFE = timedelta(days=180)
+
+
+# Status by days remaining, clamped to 0..5: <=0 expired, 1 use_today, 2-4 use_soon, >=5 fresh
+_STATUS_BY_DAYS_LEFT = ("expired", "use_today", "use_soon", "use_soon", "use_soon", "fresh")
 
 
 def _status_from_days_remaining(days_left: int) -> str:
     """Convert days remaining to a freshness status."""
-    if days_left <= 0:
-        return "expired"
-    elif days_left <= 1:
-        return "use_today"
-    elif days_left <= 4:
-        return "use_soon"
-    else:
-        return "fresh"
+    return _STATUS_BY_DAYS_LEFT[min(max(days_left, 0), 5)]
 
 
 def calculate_freshness_rule_based(
     item: PantryItem,
     rule: FreshnessRule | None = None,
+    today: date | None = None,
 ) -> tuple[str, date | None]:
     """
     Calculate freshness using rule-based logic.
     Returns (freshness_status, effective_expiration_date).
     """
-    today = date.today()
+    today = today or date.today()
 
-    # If we have a specific rule for this item
+    # A specific rule for this item wins; otherwise fall back to category defaults
     if rule:
-        if item.opened_date and rule.opened_shelf_life_days:
-            effective_exp = item.opened_date + timedelta(days=rule.opened_shelf_life_days)
-        elif item.purchase_date and rule.sealed_shelf_life_days:
-            effective_exp = item.purchase_date + timedelta(days=rule.sealed_shelf_life_days)
-        elif item.expiration_date:
-            effective_exp = item.expiration_date
-        else:
-            return "fresh", None
-
-        # Use the earlier of printed expiration and calculated expiration
-        if item.expiration_date:
-            effective_exp = min(effective_exp, item.expiration_date)
-
-        days_left = (effective_exp - today).days
-        return _status_from_days_remaining(days_left), effective_exp
-
-    # Fall back to category defaults
-    category = (item.category or "").lower()
-    sealed_days, opened_days = DEFAULT_SHELF_LIFE.get(category, (30, 14))
-
-    if item.opened_date:
-        effective_exp = item.opened_date + timedelta(days=opened_days)
-    elif item.purchase_date:
-        effective_exp = item.purchase_date + timedelta(days=sealed_days)
-    elif item.expiration_date:
-        effective_exp = item.expiration_date
+        sealed_days, opened_days = rule.sealed_shelf_life_days, rule.opened_shelf_life_days
+    else:
+        # Categories are a small bounded set, so interning them is cheap
+        category = sys.intern(item.category.lower()) if item.category else ""
+        sealed_days, opened_days = DEFAULT_SHELF_LIFE.get(category, _FALLBACK_SHELF_LIFE)
+
+    opened, purchased, printed = item.opened_date, item.purchase_date, item.expiration_date
+    if opened and opened_days:
+        effective_exp = opened + timedelta(days=opened_days)
+    elif purchased and sealed_days:
+        effective_exp = purchased + timedelta(days=sealed_days)
+    elif printed:
+        effective_exp = printed
     else:
         return "fresh", None
 
-    if item.expiration_date:
-        effective_exp = min(effective_exp, item.expiration_date)
+    # Use the earlier of printed expiration and calculated expiration
+    if printed and printed < effective_exp:
+        effective_exp = printed
 
-    # Special handling for frozen items
-    if item.location and item.location.lower() == "freezer":
-        frozen_days = 180
-        if item.purchase_date:
-            frozen_exp = item.purchase_date + timedelta(days=frozen_days)
-            effective_exp = max(effective_exp, frozen_exp)
+    # Special handling for frozen items (category defaults only)
+    if not rule and purchased and item.location and item.location.lower() == "freezer":
+        effective_exp = max(effective_exp, purchased + _FROZEN_SHELF_LIFE)
 
     days_left = (effective_exp - today).days
     return _status_from_days_remaining(days_left), effective_exp
 
 
+# ── Rule cache ───────────────────────────────────────────────────────
+# The same canonical names (milk, eggs, ...) come up across users and scans.
+# Entries are detached copies so they outlive the session that loaded them.
+
+_RULE_FIELDS = (
+    "canonical_name", "category", "sealed_shelf_life_days", "opened_shelf_life_days",
+    "storage_location", "storage_tips", "freezable", "frozen_shelf_life_days", "source",
+)
+_rule_cache = TTLCache(maxsize=4096, ttl=600)
+
+
+def _remember_rule(rule: FreshnessRule) -> FreshnessRule:
+    detached = FreshnessRule(**{f: getattr(rule, f) for f in _RULE_FIELDS})
+    _rule_cache.set(rule.canonical_name, detached)
+    return detached
+
+
+def _get_rule(db: Session, canonical: str) -> FreshnessRule | None:
+    rule = _rule_cache.get(canonical)
+    if rule is None:
+        rule = db.query(FreshnessRule).filter(
+            FreshnessRule.canonical_name == canonical
+        ).first()
+        if rule is not None:
+            rule = _remember_rule(rule)
+    return rule
+
+
+def _canonical(item: PantryItem) -> str:
+    return (item.canonical_name or "").lower().strip()
+
+
+def update_item_freshness_sync(
+    item: PantryItem,
+    rule: FreshnessRule | None = None,
+    today: date | None = None,
+) -> dict:
+    """
+    Rule-based freshness update for a single item (category defaults when
+    `rule` is None). No AI, no await. The caller is responsible for committing.
+    """
+    old_status = item.freshness_status
+    status, effective_exp = calculate_freshness_rule_based(item, rule, today)
+    item.freshness_status = status
+    item.freshness_expires_at = effective_exp
+    return _item_result(item, old_status, status, effective_exp)
+
+
 async def update_item_freshness(
     db: Session,
     item: PantryItem,
     ai: KitchenAI | None = None,
     force_ai: bool = False,
+    rules_by_canonical: dict[str, FreshnessRule] | None = None,
+    today: date | None = None,
 ) -> dict:
     """
     Update freshness for a single pantry item.
     Uses rule-based calculation first, falls back to AI if no rule exists.
-    Returns a summary dict.
+    Only the AI path awaits; everything else runs `update_item_freshness_sync`.
+    Pass `rules_by_canonical` (see `_load_rules`) to skip the per-item rule query.
+    Returns a summary dict. The caller is responsible for committing.
     """
-    today = date.today()
-    canonical = (item.canonical_name or "").lower().strip()
+    today = today or date.today()
+    canonical = _canonical(item)
 
     # Look up freshness rule
     rule = None
-    if canonical:
-        rule = db.query(FreshnessRule).filter(
-            FreshnessRule.canonical_name == canonical
-        ).first()
+    if rules_by_canonical is not None:
+        rule = rules_by_canonical.get(canonical)
+    elif canonical:
+        rule = _get_rule(db, canonical)
+
+    if rule and not force_ai:
+        return update_item_freshness_sync(item, rule, today)
+    if not ai:
+        # No AI available, use category defaults
+        return update_item_freshness_sync(item, today=today)
 
     old_status = item.freshness_status
 
-    if rule and not force_ai:
-        # Rule-based calculation
-        status, effective_exp = calculate_freshness_rule_based(item, rule)
+    # AI-based calculation
+    try:
+        result = await ai.calculate_freshness(
+            _freshness_input(item, today),
+            rules={
+                "sealed_shelf_life_days": rule.sealed_shelf_life_days,
+                "opened_shelf_life_days": rule.opened_shelf_life_days,
+                "storage_location": rule.storage_location,
+                "freezable": rule.freezable,
+                "storage_tips": rule.storage_tips,
+            } if rule else None,
+        )
+        # Cache the AI result as a new freshness rule if none exists
+        _apply_ai_result(db, item, result, rules_by_canonical, cache_rule=not rule)
+    except Exception:
+        # If AI fails, fall back to rule-based with category defaults
+        status, effective_exp = calculate_freshness_rule_based(item, today=today)
         item.freshness_status = status
         item.freshness_expires_at = effective_exp
-    elif ai and (force_ai or not rule):
-        # AI-based calculation
+
+    return _item_result(item, old_status, item.freshness_status, item.freshness_expires_at)
+
+
+def _freshness_input(item: PantryItem, today: date) -> dict:
+    """The item fields the AI freshness prompt is built from."""
+    return {
+        "name": item.name,
+        "category": item.category,
+        "location": item.location,
+        "purchase_date": str(item.purchase_date) if item.purchase_date else None,
+        "expiration_date": str(item.expiration_date) if item.expiration_date else None,
+        "opened_date": str(item.opened_date) if item.opened_date else None,
+        "quantity": item.quantity,
+        "unit": item.unit,
+        "today": str(today),
+    }
+
+
+def _apply_ai_result(
+    db: Session,
+    item: PantryItem,
+    result: dict,
+    rules_by_canonical: dict[str, FreshnessRule] | None,
+    cache_rule: bool,
+) -> None:
+    """Write an AI freshness answer onto `item`, caching it as a rule when `cache_rule`."""
+    item.freshness_status = result.get("freshness_status", "fresh")
+    exp_str = result.get("effective_expiration_date")
+    if exp_str:
         try:
-            result = await ai.calculate_freshness(
-                {
-                    "name": item.name,
-                    "category": item.category,
-                    "location": item.location,
-                    "purchase_date": str(item.purchase_date) if item.purchase_date else None,
-                    "expiration_date": str(item.expiration_date) if item.expiration_date else None,
-                    "opened_date": str(item.opened_date) if item.opened_date else None,
-                    "quantity": item.quantity,
-                    "unit": item.unit,
-                    "today": str(today),
-                },
-                rule={
-                    "sealed_shelf_life_days": rule.sealed_shelf_life_days,
-                    "opened_shelf_life_days": rule.opened_shelf_life_days,
-                    "storage_location": rule.storage_location,
-                    "freezable": rule.freezable,
-                    "storage_tips": rule.storage_tips,
-                } if rule else None,
-            )
-            item.freshness_status = result.get("freshness_status", "fresh")
-            exp_str = result.get("effective_expiration_date")
-            if exp_str:
-                try:
-                    item.freshness_expires_at = date.fromisoformat(exp_str)
-                except ValueError:
-                    pass
-
-            # Cache the AI result as a new freshness rule if none exists
-            if not rule and canonical:
-                _cache_freshness_rule(db, canonical, item, result)
+            item.freshness_expires_at = date.fromisoformat(exp_str)
+        except ValueError:
+            pass
+
+    canonical = _canonical(item)
+    if cache_rule and canonical:
+        new_rule = _cache_freshness_rule(db, canonical, item, result)
+        if rules_by_canonical is not None:
+            # Later items with the same name reuse it instead of re-asking the AI
+            rules_by_canonical[canonical] = new_rule
+
+
+async def _ask_ai_batch(
+    db: Session,
+    ai: KitchenAI,
+    items: list[PantryItem],
+    rules_by_canonical: dict[str, FreshnessRule],
+    today: date,
+) -> list[dict]:
+    """
+    AI freshness for `items` as one Message Batches job. Items the batch has
+    no answer for (errored, expired, or the whole batch failed or timed out)
+    get category defaults. The caller is responsible for committing.
+    """
+    if not items:
+        return []
+    try:
+        answers = await ai.check_freshness_batch(
+            [{"id": str(i.id), **_freshness_input(i, today)} for i in items], use_batch_api=True,
+        )
+    except Exception as e:
+        logger.warning(f"Batch freshness check failed for {len(items)} items: {e}")
+        answers = []
+    by_id = {a["item_id"]: a for a in answers}
 
+    results = []
+    for item in items:
+        answer = by_id.get(str(item.id))
+        if answer is None:
+            results.append(update_item_freshness_sync(item, today=today))
+            continue
+        old_status = item.freshness_status
+        try:
+            _apply_ai_result(db, item, answer, rules_by_canonical, cache_rule=True)
         except Exception:
-            # If AI fails, fall back to rule-based with category defaults
-            status, effective_exp = calculate_freshness_rule_based(item)
+            status, effective_exp = calculate_freshness_rule_based(item, today=today)
             item.freshness_status = status
             item.freshness_expires_at = effective_exp
-    else:
-        # No AI available, use category defaults
-        status, effective_exp = calculate_freshness_rule_based(item)
-        item.freshness_status = status
-        item.freshness_expires_at = effective_exp
+        results.append(_item_result(item, old_status, item.freshness_status, item.freshness_expires_at))
+    return results
 
-    db.commit()
 
+def _item_result(item: PantryItem, old_status: str | None, new_status: str, effective_exp: date | None) -> dict:
     return {
         "item_id": str(item.id),
         "name": item.name,
         "old_status": old_status,
-        "new_status": item.freshness_status,
-        "effective_expiration": str(item.freshness_expires_at) if item.freshness_expires_at else None,
-        "changed": old_status != item.freshness_status,
+        "new_status": new_status,
+        "effective_expiration": str(effective_exp) if effective_exp else None,
+        "changed": old_status != new_status,
     }
 
 
@@ -197,9 +301,13 @@ def _cache_freshness_rule(
     canonical: str,
     item: PantryItem,
     ai_result: dict,
-) -> None:
-    """Cache an AI freshness result as a freshness_rule for future lookups."""
-    today = date.today()
+) -> FreshnessRule:
+    """
+    Cache an AI freshness result as a freshness_rule for future lookups.
+    The row is buffered on the session and inserted with the rest of the
+    buffer when the session commits. Returns an unsaved FreshnessRule
+    carrying the same values.
+    """
     exp_str = ai_result.get("effective_expiration_date")
     exp_date = None
     try:
@@ -214,63 +322,224 @@ def _cache_freshness_rule(
     if exp_date and item.opened_date:
         opened_days = (exp_date - item.opened_date).days
 
-    new_rule = FreshnessRule(
-        canonical_name=canonical,
-        category=item.category,
-        sealed_shelf_life_days=sealed_days,
-        opened_shelf_life_days=opened_days,
-        storage_location=item.location,
-        storage_tips=ai_result.get("storage_tips"),
-        freezable=None,
-        frozen_shelf_life_days=None,
-        source="AI estimate",
-    )
-    db.add(new_rule)
-    try:
-        db.flush()
-    except Exception:
-        db.rollback()
+    values = {
+        "canonical_name": canonical,
+        "category": item.category,
+        "sealed_shelf_life_days": sealed_days,
+        "opened_shelf_life_days": opened_days,
+        "storage_location": item.location,
+        "storage_tips": ai_result.get("storage_tips"),
+        "freezable": None,
+        "frozen_shelf_life_days": None,
+        "source": "AI estimate",
+    }
+    _rule_cache.pop(canonical, None)
+    db.info.setdefault(_PENDING_RULES_KEY, []).append(values)
+    return FreshnessRule(**values)
 
 
-async def run_freshness_scan(
-    db: Session,
-    user_id,
-    ai: KitchenAI | None = None,
-) -> dict:
-    """
-    Run a full freshness scan for a user's pantry.
-    Updates all items that have dates (purchase, opened, or expiration).
-    Returns summary of changes.
-    """
-    items = db.query(PantryItem).filter(
+_PENDING_RULES_KEY = "pending_freshness_rules"
+
+# Concurrent AI freshness calls per scan
+_AI_SCAN_CONCURRENCY = 10
+
+
+@event.listens_for(Session, "before_commit")
+def _insert_pending_rules(session: Session) -> None:
+    """Write buffered rules in one statement, skipping names another scan already cached."""
+    rows = session.info.pop(_PENDING_RULES_KEY, None)
+    if rows:
+        session.execute(
+            pg_insert(FreshnessRule).on_conflict_do_nothing(index_elements=["canonical_name"]),
+            rows,
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_rules(session: Session) -> None:
+    session.info.pop(_PENDING_RULES_KEY, None)
+
+
+# ── Scans ────────────────────────────────────────────────────────────
+
+# Everything the rule-based and AI paths read; the rest of the row stays deferred
+_SCAN_COLUMNS = (
+    PantryItem.id, PantryItem.name, PantryItem.canonical_name, PantryItem.category,
+    PantryItem.location, PantryItem.quantity, PantryItem.unit,
+    PantryItem.purchase_date, PantryItem.opened_date, PantryItem.expiration_date,
+    PantryItem.freshness_status, PantryItem.freshness_expires_at,
+)
+
+
+def _scannable_items(db: Session, user_id) -> list[PantryItem]:
+    """A user's pantry items that have date info (purchase, opened, or expiration)."""
+    return db.query(PantryItem).filter(
         PantryItem.user_id == user_id,
-    ).all()
+        or_(
+            PantryItem.purchase_date.isnot(None),
+            PantryItem.opened_date.isnot(None),
+            PantryItem.expiration_date.isnot(None),
+        ),
+    ).options(load_only(*_SCAN_COLUMNS)).all()
+
+
+def _load_rules(db: Session, items: list[PantryItem]) -> dict[str, FreshnessRule]:
+    """Freshness rules for every canonical name in `items`: cache first, then one query for the rest."""
+    rules = {}
+    misses = []
+    for canonical in {_canonical(i) for i in items} - {""}:
+        rule = _rule_cache.get(canonical)
+        if rule is None:
+            misses.append(canonical)
+        else:
+            rules[canonical] = rule
+    if misses:
+        for rule in db.query(FreshnessRule).filter(FreshnessRule.canonical_name.in_(misses)):
+            rules[rule.canonical_name] = _remember_rule(rule)
+    return rules
 
-    results = []
-    changes = 0
-    alerts = []
 
-    for item in items:
-        # Only process items with date info
-        if not (item.purchase_date or item.opened_date or item.expiration_date):
-            continue
+def _bulk_calculate_freshness(
+    items: list[PantryItem],
+    rules_by_canonical: dict[str, FreshnessRule],
+    today: date,
+) -> list[tuple[str, date | None]]:
+    """Rule-based (status, effective_expiration) for every item in one pure pass, no DB access."""
+    calculate = calculate_freshness_rule_based
+    get_rule = rules_by_canonical.get
+    return [calculate(item, get_rule(_canonical(item)), today) for item in items]
 
-        result = await update_item_freshness(db, item, ai=ai)
-        results.append(result)
 
-        if result["changed"]:
-            changes += 1
-            if result["new_status"] in ("use_today", "expired"):
-                alerts.append({
-                    "item_id": result["item_id"],
-                    "name": result["name"],
-                    "status": result["new_status"],
-                    "old_status": result["old_status"],
-                })
+def rule_based_freshness(
+    db: Session,
+    items: list[PantryItem],
+    today: date | None = None,
+) -> list[tuple[str, date | None]]:
+    """
+    Rule-based (status, effective_expiration) for items that may not be saved
+    yet, e.g. on create. One rules query (cache first), no writes.
+    """
+    return _bulk_calculate_freshness(items, _load_rules(db, items), today or date.today())
+
 
+def _apply_rule_based(
+    db: Session,
+    items: list[PantryItem],
+    rules_by_canonical: dict[str, FreshnessRule],
+    today: date,
+) -> list[dict]:
+    """
+    Rule-based freshness for many items, written back with a single
+    bulk UPDATE of the rows whose status or expiry changed. Does not commit.
+    """
+    results = []
+    updates = []
+    for item, (status, effective_exp) in zip(items, _bulk_calculate_freshness(items, rules_by_canonical, today)):
+        results.append(_item_result(item, item.freshness_status, status, effective_exp))
+        if status != item.freshness_status or effective_exp != item.freshness_expires_at:
+            updates.append({
+                "id": item.id,
+                "freshness_status": status,
+                "freshness_expires_at": effective_exp,
+            })
+    if updates:
+        db.execute(update(PantryItem), updates)
+    return results
+
+
+def _scan_summary(results: list[dict]) -> dict:
+    changed = [r for r in results if r["changed"]]
+    alerts = [
+        {
+            "item_id": r["item_id"],
+            "name": r["name"],
+            "status": r["new_status"],
+            "old_status": r["old_status"],
+        }
+        for r in changed
+        if r["new_status"] in ("use_today", "expired")
+    ]
     return {
         "items_scanned": len(results),
-        "items_changed": changes,
+        "items_changed": len(changed),
         "alerts": alerts,
         "details": results,
     }
+
+
+def run_freshness_scan_bulk(db: Session, user_id) -> dict:
+    """
+    Rule-based freshness scan for a user's pantry: one rules query,
+    one bulk UPDATE and one commit, regardless of pantry size.
+    """
+    items = _scannable_items(db, user_id)
+    results = _apply_rule_based(db, items, _load_rules(db, items), date.today())
+    db.commit()
+    return _scan_summary(results)
+
+
+async def run_freshness_scan(
+    db: Session,
+    user_id,
+    ai: KitchenAI | None = None,
+    use_batch_api: bool = False,
+) -> dict:
+    """
+    Run a full freshness scan for a user's pantry.
+    Updates all items that have dates (purchase, opened, or expiration).
+    Items with a known rule (or every item, when no AI is available) go
+    through the bulk rule-based path; only items without a rule are sent
+    to the AI one by one. With `use_batch_api` they go as one Message
+    Batches job instead, which is half price but can take minutes, so it's
+    meant for background scans. Returns summary of changes.
+    """
+    # Blocking database work runs in a worker thread (one step at a time, so
+    # the session is never shared) to keep the event loop free for other
+    # scans' Claude calls.
+    if ai is None:
+        return await asyncio.to_thread(run_freshness_scan_bulk, db, user_id)
+
+    today = date.today()
+
+    def _load_and_apply_rules() -> tuple[dict, list[PantryItem], list[dict]]:
+        items = _scannable_items(db, user_id)
+        rules = _load_rules(db, items)
+        ruled = [i for i in items if _canonical(i) in rules]
+        unruled = [i for i in items if _canonical(i) not in rules]
+        return rules, unruled, _apply_rule_based(db, ruled, rules, today)
+
+    rules, unruled, results = await asyncio.to_thread(_load_and_apply_rules)
+
+    # One AI call per distinct canonical name, run concurrently. Repeats wait
+    # and then reuse the rule cached from the first answer.
+    leaders, repeats, seen = [], [], set()
+    for item in unruled:
+        canonical = _canonical(item)
+        if canonical and canonical in seen:
+            repeats.append(item)
+        else:
+            seen.add(canonical)
+            leaders.append(item)
+
+    if use_batch_api:
+        results.extend(await _ask_ai_batch(db, ai, leaders, rules, today))
+        # A repeat whose leader got no answer takes category defaults rather
+        # than a realtime call
+        repeat_ai = None
+    else:
+        semaphore = asyncio.Semaphore(_AI_SCAN_CONCURRENCY)
+
+        async def _ask_ai(item: PantryItem) -> dict:
+            async with semaphore:
+                return await update_item_freshness(db, item, ai=ai, rules_by_canonical=rules, today=today)
+
+        # Safe on a shared session: with rules_by_canonical given, the AI path
+        # only awaits the provider and buffers rows, it never queries the DB.
+        results.extend(await asyncio.gather(*(_ask_ai(item) for item in leaders)))
+        repeat_ai = ai
+    for item in repeats:
+        results.append(await update_item_freshness(db, item, ai=repeat_ai, rules_by_canonical=rules, today=today))
+    # Also writes the rules buffered by _cache_freshness_rule
+    await asyncio.to_thread(db.commit)
+
+    return _scan_summary(results)
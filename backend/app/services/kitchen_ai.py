@@ -4,11 +4,32 @@ KitchenAI — Claude API integration service.
 All AI features for Kitchen Command Center are routed through this class.
 """
 
+import asyncio
+import base64
+import copy
+import hashlib
+import io
 import json
+import logging
 import re
-from functools import lru_cache
+from collections.abc import AsyncIterator
+from importlib.util import find_spec
+from typing import Literal
+from functools import lru_cache, wraps
+
+import msgspec
 
 from app.config import get_settings
+from app.schemas.recipe import clean_instructions
+from app.utils.cache import TTLCache
+from app.utils.rate_limit import AsyncTokenBucket
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # uploads are sent as-is without Pillow
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
 
 RECIPE_JSON_SCHEMA = """\
 Return valid JSON matching this exact structure:
@@ -31,13 +52,488 @@ Return valid JSON matching this exact structure:
 Only include dietary_flags that actually apply. Normalize ingredient names to common forms (e.g., "garlic" not "fresh garlic cloves"). Return ONLY the JSON, no markdown fences or extra text."""
 
 
+_HTTP2_AVAILABLE = find_spec("h2") is not None
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)```")
+
+# One system prompt for every recipe parser, so they share a cached prefix;
+# the source-specific instructions go in the user message
+_RECIPE_PARSER_SYSTEM = (
+    "You are a recipe extraction expert. Extract a structured recipe from the content the user provides: "
+    "a web page, a YouTube video description/transcript, or a photo of a cookbook page, recipe card, or "
+    "handwritten recipe. Extract ingredients with quantities (even if spoken casually), steps in order, "
+    "timing cues, servings, tips, and any attribution. Note which measurements are approximations. "
+    + RECIPE_JSON_SCHEMA
+)
+
+_RECIPE_PARSER_PROMPTS = {
+    "url": (
+        "Please fetch and parse the recipe from this URL: {payload}\n\n"
+        "Extract all recipe information including ingredients with exact quantities, "
+        "step-by-step instructions, timing, servings, and any attribution. "
+        "If you cannot access the URL, return your best interpretation of what the URL likely contains "
+        "based on its structure, or return an error in the description field."
+    ),
+    "youtube": (
+        "Parse the recipe from this YouTube video: {payload}\n\n"
+        "Extract the full recipe with all ingredients and steps. "
+        "If the creator eyeballs measurements, provide your best estimate with a note."
+    ),
+    "image": (
+        "This is a photo of a recipe (cookbook page, recipe card, or handwritten). "
+        "Extract all visible text and structure it into a complete recipe with ingredients, instructions, and metadata."
+    ),
+}
+
+
+# ── System prompts ───────────────────────────────────────────────────
+# Built once at import rather than on every call.
+
+_SYS_PARSE_RECEIPT = (
+    "You are a grocery receipt parser. Extract line items from the receipt image. "
+    "For each item return JSON array: [{\"name\": \"...\", \"quantity\": number, "
+    "\"unit\": \"string or null\", \"price\": number or null, \"brand\": \"string or null\", "
+    "\"category\": \"string or null\"}]. "
+    "Map abbreviations to full names (e.g., 'ORG BNS CHKN BRST' -> 'Organic Boneless Chicken Breast'). "
+    "Return ONLY the JSON array."
+)
+
+_SYS_GENERATE_RECIPE = (
+    "You are a creative chef. Generate a recipe using primarily ingredients the user already has. "
+    "Reference ingredients by their exact pantry names. Only suggest equipment the user owns. "
+    "Be creative but practical. " + RECIPE_JSON_SCHEMA
+)
+
+_SYS_NORMALIZE_INGREDIENT = (
+    "You are an ingredient parser. Parse the raw ingredient string into structured data "
+    "and find the best matching item from the user's pantry. Return JSON:\n"
+    '{"ingredient_name": "...", "canonical_name": "...", "quantity": number or null, '
+    '"unit": "string or null", "preparation": "string or null", '
+    '"pantry_match": {"id": "uuid or null", "name": "string or null", "confidence": 0.0-1.0}}\n'
+    "Return ONLY the JSON."
+)
+
+_SYS_MEAL_PLAN = (
+    "You are a meal planning expert. Generate a practical meal plan for the specified date range. "
+    "Prioritize: (1) using items with 'use_soon' or 'use_today' freshness status, "
+    "(2) variety in cuisine and protein, (3) recipes the user hasn't cooked recently, "
+    "(4) respecting time constraints for weeknights (under 45 min). "
+    "For each meal, specify either a recipe_id from the user's collection or suggest a custom_meal description. "
+    "Return a JSON array of meal plan entries:\n"
+    '[{"plan_date": "YYYY-MM-DD", "meal_type": "breakfast|lunch|dinner|snack", '
+    '"recipe_id": "uuid or null", "recipe_name": "string", "custom_meal": "string or null", '
+    '"servings": integer, "notes": "string or null"}]\n'
+    "Return ONLY the JSON array."
+)
+
+_SYS_GROCERY_FROM_PLAN = (
+    "You are a grocery list generator. Given a meal plan with recipes and a pantry inventory, "
+    "calculate what needs to be purchased. Subtract items already in stock. Use preferred brands "
+    "when available. Round up to buyable quantities (e.g., need 3 oz cream cheese → list 8 oz package). "
+    "Return a JSON array of grocery items:\n"
+    '[{"item_name": "Brand Name (size)", "canonical_name": "generic name", "quantity": number, '
+    '"unit": "string", "category": "store section", "estimated_price": number or null, '
+    '"source": "meal_plan", "notes": "for Recipe Name"}]\n'
+    "Group by store section. Return ONLY the JSON array."
+)
+
+_SYS_SPLIT_GROCERY = (
+    "You are a grocery shopping optimizer. Split this grocery list into store-specific sublists. "
+    "Consider: specialty items go to specialty stores (H Mart for Asian ingredients, etc.), "
+    "bulk items to warehouse stores (Costco), and regular items to the primary grocery store. "
+    "Return JSON: {\"stores\": {\"Store Name\": [{item}, ...], ...}}\n"
+    "Each item keeps all its original fields. Return ONLY the JSON."
+)
+
+_SYS_FRESHNESS = (
+    "You are a food safety and freshness expert. Estimate the effective remaining shelf life "
+    "of this food item. Consider: storage method, whether it's been opened, category norms, "
+    "and USDA guidelines. Return JSON:\n"
+    '{"freshness_status": "fresh|use_soon|use_today|expired", '
+    '"effective_expiration_date": "YYYY-MM-DD", '
+    '"confidence": 0.0-1.0, '
+    '"reasoning": "brief explanation", '
+    '"storage_tips": "how to maximize remaining life"}\n'
+    "Return ONLY the JSON."
+)
+
+_SYS_SUBSTITUTIONS = (
+    "You are a culinary substitution expert. The user is missing an ingredient for a recipe. "
+    "Suggest 1-3 substitutions from items they actually have in their pantry. "
+    "Rank by how well they'd work. Include quantity adjustments and technique modifications. "
+    "Return JSON array:\n"
+    '[{"substitute_name": "...", "pantry_item_id": "uuid or null", '
+    '"quantity": number, "unit": "string", '
+    '"confidence": 0.0-1.0, "notes": "technique adjustments", '
+    '"flavor_impact": "brief description of how taste will differ"}]\n'
+    "Return ONLY the JSON array."
+)
+
+_SYS_WASTE_ANALYSIS = (
+    "You are a food waste reduction expert. Analyze this waste history and provide actionable insights. "
+    "Return JSON:\n"
+    '{"total_items_wasted": integer, "total_estimated_cost": number, '
+    '"most_wasted_items": [{"name": "...", "count": integer, "total_cost": number}], '
+    '"patterns": ["pattern description", ...], '
+    '"recommendations": [{"title": "short title", "description": "actionable suggestion", "priority": "high|medium|low"}], '
+    '"waste_by_reason": {"expired": integer, "spoiled": integer, "forgot": integer, "overcooked": integer, "didnt_like": integer}, '
+    '"waste_by_category": {"produce": number, "dairy": number, ...}, '
+    '"trend": "improving|worsening|stable", '
+    '"monthly_summary": [{"month": "YYYY-MM", "cost": number, "count": integer}]}\n'
+    "Return ONLY the JSON."
+)
+
+_SYS_WHAT_CAN_I_MAKE = (
+    "You are a creative chef. Suggest 5-8 recipes the user can make RIGHT NOW with what they have. "
+    "Prioritize items that need to be used soon (use_today, use_soon freshness). "
+    "Only suggest equipment the user owns. Return JSON array:\n"
+    '[{"name": "Recipe Name", "description": "brief", "difficulty": "easy|medium|hard", '
+    '"total_time_minutes": integer, "uses_expiring": ["item1", "item2"], '
+    '"missing_items": ["item that would be nice but not required"], '
+    '"key_ingredients": ["main items from pantry"], '
+    '"cuisine": "string", "meal_type": "breakfast|lunch|dinner|snack"}]\n'
+    "Return ONLY the JSON array."
+)
+
+_SYS_SEASONAL = (
+    "You are a seasonal cooking expert with deep knowledge of Michigan agriculture and seasonality. "
+    "Suggest what's in season and recipe ideas that feature seasonal ingredients. "
+    "Return JSON:\n"
+    '{"month": "Month Name", "in_season": [{"name": "ingredient", "peak": true/false, '
+    '"description": "brief note"}], '
+    '"recipe_ideas": [{"name": "Recipe Name", "description": "brief", "seasonal_ingredients": ["..."], '
+    '"total_time_minutes": integer}], '
+    '"tips": ["seasonal cooking tip", ...], '
+    '"items_user_has_in_season": ["pantry items that are currently in season"]}\n'
+    "Return ONLY the JSON."
+)
+
+_SYS_PANTRY_FORECAST = (
+    "You are a kitchen inventory analyst. Given the current pantry and upcoming meal plans, "
+    "project what the pantry will look like after all planned meals. "
+    "Return JSON:\n"
+    '{"forecast_date": "YYYY-MM-DD (end of plan period)", '
+    '"items_will_run_out": [{"name": "...", "current_qty": number, "needed_qty": number, "unit": "...", "runs_out_by": "YYYY-MM-DD"}], '
+    '"items_getting_low": [{"name": "...", "current_qty": number, "projected_qty": number, "unit": "..."}], '
+    '"items_untouched": ["items not used in any planned meal"], '
+    '"items_expiring_unused": [{"name": "...", "expires": "YYYY-MM-DD", "not_in_any_plan": true}], '
+    '"shopping_needed": [{"name": "...", "quantity_short": number, "unit": "...", "needed_for": "recipe name"}]}\n'
+    "Return ONLY the JSON."
+)
+
+_SYS_SMART_SUGGESTIONS = (
+    "You are an intelligent kitchen assistant. Based on the user's current kitchen state, "
+    "generate 3-5 contextual, actionable suggestions. Consider freshness urgency, meal planning gaps, "
+    "seasonal produce, waste patterns, and cooking variety. "
+    "Return JSON:\n"
+    '{"suggestions": [{"type": "freshness|meal_plan|waste|seasonal|variety|efficiency", '
+    '"title": "Short action title", "description": "Detailed actionable suggestion", '
+    '"priority": "high|medium|low", "related_items": ["item names"]}], '
+    '"tip_of_the_day": "A contextual cooking or storage tip"}\n'
+    "Return ONLY the JSON."
+)
+
+_SYS_SHARE_CARD = (
+    "You are a recipe content creator. Generate an engaging share card for this recipe. "
+    "Return JSON:\n"
+    '{"title": "Recipe Name", "tagline": "One catchy sentence", '
+    '"highlights": ["3-4 short bullet highlights"], '
+    '"emoji": "single relevant emoji", '
+    '"estimated_difficulty": "easy|medium|hard", '
+    '"estimated_time": "X min"}\n'
+    "Return ONLY the JSON."
+)
+
+_IMPORT_DOC_SCHEMAS = {
+    "pantry": (
+        "Extract pantry/inventory items from this text. Return JSON array:\n"
+        '[{"name": "Item Name", "category": "produce|dairy|meat|seafood|grains|canned|condiments|spices|baking|beverages|snacks|frozen|other", '
+        '"quantity": number or null, "unit": "string or null", "brand": "string or null", '
+        '"location": "fridge|freezer|pantry|counter|other", "notes": "string or null"}]\n'
+        "Parse quantities, units, and categories from context. Normalize names. Return ONLY the JSON array."
+    ),
+    "recipes": (
+        "Extract recipe(s) from this text. For each recipe return JSON matching:\n"
+        + RECIPE_JSON_SCHEMA + "\n"
+        "If there are multiple recipes, wrap them in a JSON array. Return ONLY the JSON."
+    ),
+    "tools": (
+        "Extract kitchen tools/equipment from this text. Return JSON array:\n"
+        '[{"name": "Tool Name", "category": "appliance|cookware|bakeware|utensil|knife|gadget|storage|other", '
+        '"brand": "string or null", "capabilities": ["capability1", ...], '
+        '"condition": "excellent|good|fair|poor|needs_repair", "notes": "string or null"}]\n'
+        "Return ONLY the JSON array."
+    ),
+    "grocery": (
+        "Extract grocery/shopping list items from this text. Return JSON array:\n"
+        '[{"item_name": "Item Name", "quantity": number or null, "unit": "string or null", '
+        '"category": "produce|dairy|meat|bakery|frozen|canned|beverages|snacks|household|other", '
+        '"notes": "string or null"}]\n'
+        "Parse quantities and units from context. Return ONLY the JSON array."
+    ),
+}
+
+
+def _import_doc_system(doc_type: str) -> str:
+    """System prompt for `import_google_doc`; unknown doc types use the pantry schema."""
+    schema = _IMPORT_DOC_SCHEMAS.get(doc_type, _IMPORT_DOC_SCHEMAS["pantry"])
+    return (
+        f"You are a document parser for kitchen management. "
+        f"Extract structured {doc_type} data from the user's text. "
+        f"The text may be a Google Doc export, pasted notes, a list, or free-form text. "
+        f"Capture every item mentioned. {schema}"
+    )
+
+
+_SYS_IMPORT_DOC = {doc_type: _import_doc_system(doc_type) for doc_type in _IMPORT_DOC_SCHEMAS}
+
+
 def _extract_json(text: str) -> dict:
     """Extract JSON from Claude response, handling markdown fences."""
     text = text.strip()
-    m = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-    if m:
-        text = m.group(1).strip()
-    return json.loads(text)
+    # Most responses follow "Return ONLY the JSON" and have no fence at all
+    if "```" in text:
+        m = _FENCE_RE.search(text)
+        if m:
+            text = m.group(1).strip()
+    elif text[:4].lower() == "json":
+        # Bare language tag without the fence
+        text = text[4:].lstrip()
+    # msgspec.DecodeError subclasses ValueError, like json.JSONDecodeError
+    return msgspec.json.decode(text)
+
+
+_JSON_REPAIR_PROMPT = "That response was not valid JSON. Return valid JSON only, no prose or markdown."
+
+
+# Seconds to wait after a 429 that carried no retry-after header
+_DEFAULT_RETRY_AFTER = 10.0
+
+
+def _content_chars(content: str | list[dict]) -> int:
+    """Approximate size of message or system content, for the token budget."""
+    if isinstance(content, str):
+        return len(content)
+    # Images count as roughly the ~1600 tokens of a full-size vision input
+    return sum(len(block.get("text", "")) if block.get("type") == "text" else 6400 for block in content)
+
+
+# Longest edge Claude's vision input uses; larger images are downsampled server-side anyway
+_VISION_MAX_EDGE = 1568
+
+
+def _shrink_image_b64(image_base64: str, media_type: str, grayscale: bool = False) -> tuple[str, str]:
+    """
+    Downscale an uploaded photo to the vision max edge (and optionally to
+    grayscale) as JPEG, to cut upload bytes. Returns (base64, media_type);
+    the input comes back unchanged when Pillow is missing, the image is
+    already small enough, or it can't be decoded (Claude reports that).
+    Blocking; run it in a thread.
+    """
+    if Image is None:
+        return image_base64, media_type
+    try:
+        img = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+        img.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return image_base64, media_type
+    if max(img.size) <= _VISION_MAX_EDGE and not grayscale:
+        return image_base64, media_type
+
+    # Bake in the EXIF rotation, which re-encoding would otherwise drop
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((_VISION_MAX_EDGE, _VISION_MAX_EDGE), Image.LANCZOS)
+    img = img.convert("L" if grayscale else "RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return base64.b64encode(buf.getvalue()).decode(), "image/jpeg"
+
+
+def _image_content(text: str, image_base64: str, media_type: str = "image/jpeg") -> list[dict]:
+    """User message content for a vision call: the image, then the instruction."""
+    return [
+        {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": image_base64}},
+        {"type": "text", "text": text},
+    ]
+
+
+class _ArrayElementScanner:
+    """
+    Splits a streamed top-level JSON array into the raw text of its elements.
+
+    Tracks bracket depth and string/escape state across chunks; anything
+    before the opening `[` (such as a markdown fence) and after the closing
+    `]` is ignored.
+    """
+
+    def __init__(self):
+        self._buf: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._done = False
+
+    def feed(self, chunk: str) -> list[str]:
+        """Consume a chunk and return the elements it completed."""
+        completed = []
+        buf = self._buf
+        for ch in chunk:
+            if self._done:
+                break
+            if self._depth == 0:
+                if ch == "[":
+                    self._depth = 1
+                continue
+            if self._in_string:
+                buf.append(ch)
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if self._depth == 1 and ch in ",]":
+                text = "".join(buf).strip()
+                if text:
+                    completed.append(text)
+                buf.clear()
+                self._done = ch == "]"
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+            buf.append(ch)
+        return completed
+
+
+_MONTH_NAMES = (
+    "", "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+)
+
+
+# ── Pantry prompt prefix ─────────────────────────────────────────────
+# Features that send the pantry put it first in the user message. When the
+# same pantry text was sent within the prompt-cache TTL it gets a cache
+# breakpoint, so follow-up calls only pay for the question after it. One-off
+# pantries skip the breakpoint and its cache-write surcharge.
+
+_recent_pantry_blocks = TTLCache(maxsize=4096, ttl=300)
+
+
+def _stable_order(pantry: list[dict]) -> list[dict]:
+    """Pantry in a fixed order, so the same pantry always formats to the same bytes."""
+    return sorted(pantry, key=lambda p: (str(p.get("id") or ""), str(p.get("name") or "")))
+
+
+# Most urgent first when a pantry is trimmed to fit the prompt budget
+_FRESHNESS_PRIORITY = {"expired": 0, "use_today": 1, "use_soon": 2}
+# Estimated input tokens (~4 chars each) allowed for one pantry section
+_PANTRY_TOKEN_BUDGET = 3000
+
+
+def _compact_pantry(
+    pantry: list[dict],
+    columns: tuple[str, ...] = ("name", "quantity", "unit", "freshness_status"),
+    limit: int = 80,
+    budget: int = _PANTRY_TOKEN_BUDGET,
+) -> str:
+    """
+    Pantry as a `|`-separated header row plus one row per item, most urgent
+    freshness first (ties in stable id/name order, for the cached prefix).
+    Lower-priority rows are dropped once the section passes `budget` tokens.
+    """
+    if not pantry:
+        return "Pantry is empty."
+    ordered = sorted(
+        pantry,
+        key=lambda p: (
+            _FRESHNESS_PRIORITY.get(p.get("freshness_status"), 3),
+            str(p.get("id") or ""),
+            str(p.get("name") or ""),
+        ),
+    )
+    lines = ["|".join(columns)]
+    max_chars = budget * 4 - len(lines[0])
+    for p in ordered[:limit]:
+        line = "|".join(["" if (v := p.get(c)) is None else str(v) for c in columns])
+        max_chars -= len(line) + 1
+        if max_chars < 0:
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _pantry_message(pantry_section: str, rest: str) -> list[dict]:
+    """User message content: the pantry section first, then the per-request text."""
+    block = {"type": "text", "text": pantry_section}
+    key = hashlib.blake2b(pantry_section.encode(), digest_size=16).digest()
+    if _recent_pantry_blocks.get(key) is not None:
+        block["cache_control"] = {"type": "ephemeral"}
+    _recent_pantry_blocks.set(key, True)
+    return [block, {"type": "text", "text": rest}]
+
+
+# ── Response cache ───────────────────────────────────────────────────
+# Parsed results of features whose answer depends only on their inputs
+# (re-parsing the same URL, normalizing the same string against the same pantry).
+
+_response_cache = TTLCache(maxsize=1024, ttl=3600)
+
+
+def cache_clear() -> None:
+    """Drop every cached AI response."""
+    _response_cache.clear()
+
+
+def _cached_response(key_fn):
+    """
+    Cache a KitchenAI method's parsed result under a fingerprint of
+    `key_fn(*args)`, which takes the method's arguments without `self`.
+    Hits are deep-copied so callers can't mutate the shared entry.
+    """
+    def decorator(method):
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            payload = json.dumps(key_fn(*args, **kwargs), sort_keys=True, default=str)
+            key = hashlib.blake2b(f"{method.__name__}:{payload}".encode(), digest_size=16).hexdigest()
+            cached = _response_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+            result = await method(self, *args, **kwargs)
+            _response_cache.set(key, copy.deepcopy(result))
+            return result
+        return wrapper
+    return decorator
+
+
+def _normalizer_pantry(pantry_items: list[dict]) -> list[dict]:
+    """The pantry fields normalize_ingredient matches against."""
+    return [
+        {"name": p.get("name", ""), "canonical_name": p.get("canonical_name", ""), "id": p.get("id", "")}
+        for p in pantry_items[:100]
+    ]
+
+
+def _system_blocks(system: str | list[dict]) -> list[dict]:
+    """
+    System prompt as content blocks, with the prompt marked for prompt caching.
+
+    Every system prompt here is static per feature, so the whole prompt is the
+    cacheable prefix. Callers with a per-request part pass their own blocks and
+    put `cache_control` on the stable one.
+    """
+    if isinstance(system, list):
+        return system
+    return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+
+# Lists up to this size are handled by CLAUDE_MODEL_FAST
+_FAST_MODEL_MAX_ITEMS = 30
 
 
 class KitchenAI:
@@ -46,115 +542,256 @@ class KitchenAI:
     def __init__(self):
         settings = get_settings()
         self.model = settings.CLAUDE_MODEL
+        self.model_fast = settings.CLAUDE_MODEL_FAST
         self.api_key = settings.ANTHROPIC_API_KEY
+        self.max_concurrency = settings.CLAUDE_MAX_CONCURRENCY
+        self.timeout = settings.CLAUDE_TIMEOUT_SECONDS
+        self._rpm = AsyncTokenBucket(settings.CLAUDE_RPM) if settings.CLAUDE_RPM else None
+        self._tpm = AsyncTokenBucket(settings.CLAUDE_TPM) if settings.CLAUDE_TPM else None
         self._client = None
+        self._client_loop = None
+        self._sem = None
 
     @property
     def client(self):
-        if self._client is None and self.api_key:
+        """
+        Shared AsyncAnthropic client, so its connection pool persists across calls.
+
+        The pool is bound to the event loop that created it; worker tasks that
+        wrap each run in asyncio.run() get a fresh client (and semaphore) per loop.
+        """
+        if not self.api_key:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
             import anthropic
-            self._client = anthropic.Anthropic(api_key=self.api_key)
+            # The Limits class of the httpx build the SDK itself runs on
+            limits_type = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+            self._client = anthropic.AsyncAnthropic(
+                api_key=self.api_key,
+                max_retries=3,
+                timeout=anthropic.Timeout(self.timeout, connect=5.0),
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    # Concurrent fan-out calls multiplex over one connection when h2 is installed
+                    http2=_HTTP2_AVAILABLE,
+                    limits=limits_type(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30.0),
+                ),
+            )
+            self._client_loop = loop
+            self._sem = asyncio.Semaphore(self.max_concurrency)
         return self._client
 
+    async def aclose(self) -> None:
+        """Close the client's connection pool (app shutdown)."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._client_loop = None
+
+    async def _create(
+        self, system: str | list[dict], messages: list[dict], max_tokens: int = 4096, model: str | None = None
+    ) -> str:
+        """
+        Send one Messages API request. Returns the text response.
+
+        Connection errors, 429s and 5xx responses are retried inside the SDK
+        (max_retries=3, exponential backoff honouring retry-after). A 429 that
+        outlasts those retries pauses every caller for its retry-after and is
+        tried once more.
+        """
+        if not self.client:
+            raise RuntimeError("Anthropic API key not configured")
+        import anthropic
+
+        for attempt in range(2):
+            await self._throttle(system, messages)
+            try:
+                response = await self.client.messages.create(
+                    model=model or self.model,
+                    max_tokens=max_tokens,
+                    system=_system_blocks(system),
+                    messages=messages,
+                )
+                return response.content[0].text
+            except anthropic.RateLimitError as e:
+                if attempt:
+                    raise
+                await self._back_off(e)
+
+    async def _throttle(self, system: str | list[dict], messages: list[dict]) -> None:
+        """Wait for a request slot and the estimated input tokens (~4 chars each)."""
+        if self._rpm:
+            await self._rpm.acquire()
+        if self._tpm:
+            chars = _content_chars(system) + sum(_content_chars(m["content"]) for m in messages)
+            await self._tpm.acquire(chars // 4)
+
+    async def _back_off(self, error) -> None:
+        """Honour a 429's retry-after: hold the shared buckets, or just this call if limits are off."""
+        try:
+            retry_after = float(error.response.headers.get("retry-after", _DEFAULT_RETRY_AFTER))
+        except (TypeError, ValueError):
+            retry_after = _DEFAULT_RETRY_AFTER
+        buckets = [b for b in (self._rpm, self._tpm) if b]
+        for bucket in buckets:
+            bucket.block_for(retry_after)
+        if not buckets:
+            await asyncio.sleep(retry_after)
+
     async def _call_claude(
-        self, system: str, user_message: str, max_tokens: int = 4096
+        self, system: str | list[dict], user_message: str | list[dict], max_tokens: int = 4096, model: str | None = None
     ) -> str:
         """Make a call to the Claude API. Returns the text response."""
+        return await self._create(system, [{"role": "user", "content": user_message}], max_tokens, model)
+
+    async def _call_claude_json(
+        self,
+        system: str | list[dict],
+        user_message: str | list[dict],
+        max_tokens: int = 4096,
+        model: str | None = None,
+        bounded: bool = False,
+    ):
+        """
+        Call Claude and parse its JSON answer. If the answer doesn't parse,
+        show Claude its own reply and ask once more for JSON only, instead of
+        failing the whole request. `bounded` holds the fan-out semaphore.
+        """
+        if bounded:
+            if not self.client:
+                raise RuntimeError("Anthropic API key not configured")
+            async with self._sem:
+                return await self._call_claude_json(system, user_message, max_tokens, model)
+
+        messages = [{"role": "user", "content": user_message}]
+        text = await self._create(system, messages, max_tokens, model)
+        try:
+            return _extract_json(text)
+        except ValueError:
+            pass
+        if text.strip():
+            messages = messages + [
+                {"role": "assistant", "content": text.strip()},
+                {"role": "user", "content": _JSON_REPAIR_PROMPT},
+            ]
+        text = await self._create(system, messages, max_tokens, model)
+        return _extract_json(text)
+
+    async def _stream_claude(
+        self, system: str | list[dict], user_message: str | list[dict], max_tokens: int = 4096, model: str | None = None
+    ) -> AsyncIterator[str]:
+        """Stream a Claude response as text deltas."""
         if not self.client:
             raise RuntimeError("Anthropic API key not configured")
-        response = self.client.messages.create(
-            model=self.model,
+        messages = [{"role": "user", "content": user_message}]
+        await self._throttle(system, messages)
+        async with self.client.messages.stream(
+            model=model or self.model,
             max_tokens=max_tokens,
-            system=system,
-            messages=[{"role": "user", "content": user_message}],
-        )
-        return response.content[0].text
+            system=_system_blocks(system),
+            messages=messages,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
 
-    async def _call_claude_with_image(
-        self, system: str, text: str, image_base64: str, media_type: str = "image/jpeg", max_tokens: int = 4096
-    ) -> str:
-        """Call Claude with an image (vision)."""
+    async def _stream_json_array(
+        self, system: str | list[dict], user_message: str | list[dict], max_tokens: int = 4096, model: str | None = None
+    ) -> AsyncIterator:
+        """Stream a JSON-array response, yielding each element once it is complete."""
+        scanner = _ArrayElementScanner()
+        async for chunk in self._stream_claude(system, user_message, max_tokens, model):
+            for text in scanner.feed(chunk):
+                try:
+                    yield msgspec.json.decode(text)
+                except msgspec.DecodeError:
+                    continue
+
+    # ── Message Batches ──────────────────────────────────────────────
+
+    def _batch_request(
+        self,
+        custom_id: str,
+        system: str | list[dict],
+        user_message: str | list[dict],
+        max_tokens: int = 4096,
+        model: str | None = None,
+    ) -> dict:
+        """One entry for `submit_batch`, with the same params `_call_claude` sends."""
+        return {
+            "custom_id": custom_id,
+            "params": {
+                "model": model or self.model,
+                "max_tokens": max_tokens,
+                "system": _system_blocks(system),
+                "messages": [{"role": "user", "content": user_message}],
+            },
+        }
+
+    async def submit_batch(self, requests: list[dict]) -> str:
+        """Submit requests to the Message Batches API. Returns the batch id."""
         if not self.client:
             raise RuntimeError("Anthropic API key not configured")
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            system=system,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": image_base64}},
-                    {"type": "text", "text": text},
-                ],
-            }],
-        )
-        return response.content[0].text
+        batch = await self.client.messages.batches.create(requests=requests)
+        return batch.id
+
+    async def poll_batch(self, batch_id: str, interval: float = 15.0, timeout: float = 3600.0) -> dict[str, str]:
+        """
+        Wait for a batch to end and return {custom_id: text} for the requests
+        that succeeded. Errored, canceled and expired requests are left out.
+        Raises TimeoutError, after asking for the batch to be canceled, if it
+        hasn't ended within `timeout` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            batch = await self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                break
+            if loop.time() >= deadline:
+                await self.client.messages.batches.cancel(batch_id)
+                raise TimeoutError(f"Message batch {batch_id} did not end within {timeout:.0f}s")
+            await asyncio.sleep(interval)
+
+        texts = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                texts[entry.custom_id] = entry.result.message.content[0].text
+        return texts
 
     # ── Phase 2: Recipe Parsers ──────────────────────────────────────
 
+    @_cached_response(lambda kind, payload, media_type="image/jpeg": (kind, payload, media_type))
+    async def _parse_recipe(self, kind: Literal["url", "youtube", "image"], payload: str, media_type: str = "image/jpeg") -> dict:
+        """Parse a recipe from a URL, a YouTube link, or a base64 photo. All three share one system prompt."""
+        if kind == "image":
+            payload, media_type = await asyncio.to_thread(_shrink_image_b64, payload, media_type)
+            content = _image_content(_RECIPE_PARSER_PROMPTS["image"], payload, media_type)
+        else:
+            content = _RECIPE_PARSER_PROMPTS[kind].format(payload=payload)
+        recipe = await self._call_claude_json(_RECIPE_PARSER_SYSTEM, content, max_tokens=4096)
+        # The client posts this back as RecipeCreate, whose steps are strictly validated
+        if isinstance(recipe, dict) and "instructions" in recipe:
+            recipe["instructions"] = clean_instructions(recipe["instructions"])
+        return recipe
+
     async def parse_recipe_url(self, url: str) -> dict:
         """Parse a recipe from a website URL into structured JSON."""
-        system = (
-            "You are a recipe extraction expert. Extract a structured recipe from the content "
-            "the user provides. " + RECIPE_JSON_SCHEMA
-        )
-        user_msg = (
-            f"Please fetch and parse the recipe from this URL: {url}\n\n"
-            "Extract all recipe information including ingredients with exact quantities, "
-            "step-by-step instructions, timing, servings, and any attribution. "
-            "If you cannot access the URL, return your best interpretation of what the URL likely contains "
-            "based on its structure, or return an error in the description field."
-        )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._parse_recipe("url", url)
 
     async def parse_recipe_youtube(self, url: str) -> dict:
         """Parse a recipe from a YouTube video transcript."""
-        system = (
-            "You are a recipe extraction expert. Parse a recipe from a YouTube video description/transcript. "
-            "Extract ingredients with quantities (even if spoken casually), steps in order, timing cues, "
-            "and any tips mentioned. Note which measurements are approximations. " + RECIPE_JSON_SCHEMA
-        )
-        user_msg = (
-            f"Parse the recipe from this YouTube video: {url}\n\n"
-            "Extract the full recipe with all ingredients and steps. "
-            "If the creator eyeballs measurements, provide your best estimate with a note."
-        )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._parse_recipe("youtube", url)
 
     async def parse_recipe_image(self, image_base64: str, media_type: str = "image/jpeg") -> dict:
         """OCR and parse a recipe from a photo."""
-        system = (
-            "You are a recipe OCR and extraction expert. Extract all visible text from this recipe photo "
-            "and structure it into a complete recipe. " + RECIPE_JSON_SCHEMA
-        )
-        text = await self._call_claude_with_image(
-            system,
-            "This is a photo of a recipe (cookbook page, recipe card, or handwritten). "
-            "Extract all visible text and structure it into a complete recipe with ingredients, instructions, and metadata.",
-            image_base64,
-            media_type,
-        )
-        return _extract_json(text)
+        return await self._parse_recipe("image", image_base64, media_type)
 
     async def parse_receipt(self, image_base64: str, media_type: str = "image/jpeg") -> list[dict]:
         """Extract grocery items from a receipt photo."""
-        system = (
-            "You are a grocery receipt parser. Extract line items from the receipt image. "
-            "For each item return JSON array: [{\"name\": \"...\", \"quantity\": number, "
-            "\"unit\": \"string or null\", \"price\": number or null, \"brand\": \"string or null\", "
-            "\"category\": \"string or null\"}]. "
-            "Map abbreviations to full names (e.g., 'ORG BNS CHKN BRST' -> 'Organic Boneless Chicken Breast'). "
-            "Return ONLY the JSON array."
-        )
-        text = await self._call_claude_with_image(
-            system,
-            "Extract all grocery items from this receipt image.",
-            image_base64,
-            media_type,
-        )
-        return _extract_json(text)
+        # Receipts are black-and-white text; grayscale JPEG is smaller and reads the same
+        image_base64, media_type = await asyncio.to_thread(_shrink_image_b64, image_base64, media_type, True)
+        content = _image_content("Extract all grocery items from this receipt image.", image_base64, media_type)
+        return await self._call_claude_json(_SYS_PARSE_RECEIPT, content)
 
     # ── Phase 2: Recipe Generator ────────────────────────────────────
 
@@ -162,15 +799,7 @@ class KitchenAI:
         self, constraints: dict, pantry: list[dict], tools: list[dict]
     ) -> dict:
         """Generate a novel recipe using the user's actual inventory."""
-        system = (
-            "You are a creative chef. Generate a recipe using primarily ingredients the user already has. "
-            "Reference ingredients by their exact pantry names. Only suggest equipment the user owns. "
-            "Be creative but practical. " + RECIPE_JSON_SCHEMA
-        )
-        pantry_summary = "\n".join(
-            f"- {p.get('name', '?')} ({p.get('quantity', '?')} {p.get('unit', '')})"
-            for p in pantry[:80]
-        ) or "Pantry is empty."
+        pantry_summary = _compact_pantry(pantry, ("name", "quantity", "unit"))
 
         tools_summary = "\n".join(
             f"- {t.get('name', '?')} ({', '.join(t.get('capabilities', []))})"
@@ -189,39 +818,28 @@ class KitchenAI:
         if constraints.get("description"):
             constraint_lines.append(f"Description/mood: {constraints['description']}")
 
-        user_msg = (
+        user_msg = _pantry_message(
+            f"Available pantry items:\n{pantry_summary}",
+            f"Available equipment:\n{tools_summary}\n\n"
             f"Generate a recipe with these constraints:\n"
-            f"{chr(10).join(constraint_lines) or 'No specific constraints.'}\n\n"
-            f"Available pantry items:\n{pantry_summary}\n\n"
-            f"Available equipment:\n{tools_summary}"
+            f"{chr(10).join(constraint_lines) or 'No specific constraints.'}",
         )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_GENERATE_RECIPE, user_msg, max_tokens=4096)
 
     # ── Phase 2: Ingredient Normalizer ───────────────────────────────
 
+    # Keyed on the same pantry fields the prompt sends, so a rename is a miss
+    @_cached_response(lambda raw, pantry_items: (raw, _normalizer_pantry(pantry_items)))
     async def normalize_ingredient(
         self, raw: str, pantry_items: list[dict]
     ) -> dict:
         """Parse and normalize an ingredient string, fuzzy-match to pantry."""
-        pantry_names = [
-            {"name": p.get("name", ""), "canonical_name": p.get("canonical_name", ""), "id": p.get("id", "")}
-            for p in pantry_items[:100]
-        ]
-        system = (
-            "You are an ingredient parser. Parse the raw ingredient string into structured data "
-            "and find the best matching item from the user's pantry. Return JSON:\n"
-            '{"ingredient_name": "...", "canonical_name": "...", "quantity": number or null, '
-            '"unit": "string or null", "preparation": "string or null", '
-            '"pantry_match": {"id": "uuid or null", "name": "string or null", "confidence": 0.0-1.0}}\n'
-            "Return ONLY the JSON."
-        )
+        pantry_names = _normalizer_pantry(pantry_items)
         user_msg = (
             f"Parse this ingredient: \"{raw}\"\n\n"
-            f"User's pantry items:\n{json.dumps(pantry_names, indent=2)}"
+            f"User's pantry items:\n{msgspec.json.encode(pantry_names).decode()}"
         )
-        text = await self._call_claude(system, user_msg, max_tokens=1024)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_NORMALIZE_INGREDIENT, user_msg, max_tokens=1024, model=self.model_fast)
 
     # ── Phase 3: Meal Planning ────────────────────────────────────────
 
@@ -234,33 +852,21 @@ class KitchenAI:
         preferences: dict,
     ) -> list[dict]:
         """Generate a multi-day meal plan considering pantry, recipes, history, and preferences."""
-        system = (
-            "You are a meal planning expert. Generate a practical meal plan for the specified date range. "
-            "Prioritize: (1) using items with 'use_soon' or 'use_today' freshness status, "
-            "(2) variety in cuisine and protein, (3) recipes the user hasn't cooked recently, "
-            "(4) respecting time constraints for weeknights (under 45 min). "
-            "For each meal, specify either a recipe_id from the user's collection or suggest a custom_meal description. "
-            "Return a JSON array of meal plan entries:\n"
-            '[{"plan_date": "YYYY-MM-DD", "meal_type": "breakfast|lunch|dinner|snack", '
-            '"recipe_id": "uuid or null", "recipe_name": "string", "custom_meal": "string or null", '
-            '"servings": integer, "notes": "string or null"}]\n'
-            "Return ONLY the JSON array."
-        )
+        get = dict.get
+        pantry_summary = _compact_pantry(pantry)
 
-        pantry_summary = "\n".join(
-            f"- {p.get('name', '?')} ({p.get('quantity', '?')} {p.get('unit', '')}) [{p.get('freshness_status', 'fresh')}]"
-            for p in pantry[:80]
-        ) or "Pantry is empty."
-
-        recipe_summary = "\n".join(
-            f"- {r.get('id', '?')}: {r.get('name', '?')} ({r.get('cuisine', '?')}, {r.get('total_time_minutes', '?')} min, {r.get('difficulty', '?')})"
+        # Cuisine is always sent: the system prompt asks for variety in it
+        recipe_rows = [
+            "%s|%s|%s|%s" % (get(r, "id", "?"), get(r, "name", "?"), get(r, "total_time_minutes", "?"), get(r, "cuisine", "?"))
             for r in recipes[:60]
-        ) or "No recipes saved."
+        ]
+        recipe_header = "id|name|minutes|cuisine"
+        recipe_summary = "\n".join([recipe_header, *recipe_rows]) if recipe_rows else "No recipes saved."
 
-        history_summary = "\n".join(
-            f"- {h.get('recipe_name', '?')} on {h.get('plan_date', '?')}"
+        history_summary = "\n".join([
+            "- %s on %s" % (get(h, "recipe_name", "?"), get(h, "plan_date", "?"))
             for h in history[:30]
-        ) or "No recent meal history."
+        ]) or "No recent meal history."
 
         pref_lines = []
         if preferences.get("preferred_cuisines"):
@@ -272,15 +878,14 @@ class KitchenAI:
         if preferences.get("meals_per_day"):
             pref_lines.append(f"Meals to plan: {', '.join(preferences['meals_per_day'])}")
 
-        user_msg = (
-            f"Generate a meal plan from {date_range.get('start_date', '?')} to {date_range.get('end_date', '?')}.\n\n"
-            f"Preferences:\n{chr(10).join(pref_lines) or 'No specific preferences.'}\n\n"
-            f"Current pantry (prioritize use_soon/use_today items):\n{pantry_summary}\n\n"
+        user_msg = _pantry_message(
+            f"Current pantry (prioritize use_soon/use_today items):\n{pantry_summary}",
             f"User's recipe collection:\n{recipe_summary}\n\n"
-            f"Recent meal history (avoid repeats):\n{history_summary}"
+            f"Recent meal history (avoid repeats):\n{history_summary}\n\n"
+            f"Preferences:\n{chr(10).join(pref_lines) or 'No specific preferences.'}\n\n"
+            f"Generate a meal plan from {date_range.get('start_date', '?')} to {date_range.get('end_date', '?')}.",
         )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_MEAL_PLAN, user_msg, max_tokens=4096)
 
     async def generate_grocery_from_plan(
         self,
@@ -289,68 +894,50 @@ class KitchenAI:
         preferences: dict,
     ) -> list[dict]:
         """Generate a grocery list from meal plan, subtracting pantry stock and using brand preferences."""
-        system = (
-            "You are a grocery list generator. Given a meal plan with recipes and a pantry inventory, "
-            "calculate what needs to be purchased. Subtract items already in stock. Use preferred brands "
-            "when available. Round up to buyable quantities (e.g., need 3 oz cream cheese → list 8 oz package). "
-            "Return a JSON array of grocery items:\n"
-            '[{"item_name": "Brand Name (size)", "canonical_name": "generic name", "quantity": number, '
-            '"unit": "string", "category": "store section", "estimated_price": number or null, '
-            '"source": "meal_plan", "notes": "for Recipe Name"}]\n'
-            "Group by store section. Return ONLY the JSON array."
-        )
-
-        plan_summary = "\n".join(
-            f"- {m.get('recipe_name', m.get('custom_meal', '?'))} ({m.get('servings', '?')} servings, {m.get('plan_date', '?')}): "
-            f"Ingredients: {', '.join(i.get('ingredient_name', '?') + ' (' + str(i.get('quantity', '?')) + ' ' + str(i.get('unit', '')) + ')' for i in m.get('ingredients', []))}"
+        get = dict.get
+        plan_summary = "\n".join([
+            "- %s (%s servings, %s): Ingredients: %s" % (
+                get(m, "recipe_name", get(m, "custom_meal", "?")),
+                get(m, "servings", "?"), get(m, "plan_date", "?"),
+                ", ".join([
+                    "%s (%s %s)" % (get(i, "ingredient_name", "?"), get(i, "quantity", "?"), get(i, "unit", ""))
+                    for i in get(m, "ingredients", [])
+                ]),
+            )
             for m in meal_plans
-        ) or "No meals planned."
+        ]) or "No meals planned."
 
-        pantry_summary = "\n".join(
-            f"- {p.get('name', '?')} ({p.get('quantity', '?')} {p.get('unit', '')}) brand={p.get('preferred_brand') or p.get('brand', 'any')}"
-            for p in pantry[:80]
-        ) or "Pantry is empty."
+        pantry_summary = "\n".join([
+            "- %s (%s %s) brand=%s" % (
+                get(p, "name", "?"), get(p, "quantity", "?"), get(p, "unit", ""),
+                get(p, "preferred_brand") or get(p, "brand", "any"),
+            )
+            for p in _stable_order(pantry)[:80]
+        ]) or "Pantry is empty."
 
-        user_msg = (
+        user_msg = _pantry_message(
+            f"Current pantry stock (subtract these):\n{pantry_summary}",
             f"Generate a grocery list for these planned meals:\n{plan_summary}\n\n"
-            f"Current pantry stock (subtract these):\n{pantry_summary}\n\n"
-            f"Use preferred brands where known. Round up to standard package sizes."
+            f"Use preferred brands where known. Round up to standard package sizes.",
         )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_GROCERY_FROM_PLAN, user_msg, max_tokens=4096)
 
     async def split_grocery_by_store(
         self, items: list[dict], stores: list[str] | None = None,
     ) -> dict:
         """Split a grocery list into store-specific sublists."""
-        system = (
-            "You are a grocery shopping optimizer. Split this grocery list into store-specific sublists. "
-            "Consider: specialty items go to specialty stores (H Mart for Asian ingredients, etc.), "
-            "bulk items to warehouse stores (Costco), and regular items to the primary grocery store. "
-            "Return JSON: {\"stores\": {\"Store Name\": [{item}, ...], ...}}\n"
-            "Each item keeps all its original fields. Return ONLY the JSON."
-        )
         store_hint = f"Available stores: {', '.join(stores)}" if stores else "Use common store types (Main Grocery, Asian Market, Specialty, Bulk/Warehouse)."
         items_text = json.dumps(items, indent=2)
         user_msg = f"{store_hint}\n\nGrocery items to split:\n{items_text}"
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        # Sorting a short list by store is simple enough for the fast model
+        model = self.model_fast if len(items) <= _FAST_MODEL_MAX_ITEMS else None
+        return await self._call_claude_json(_SYS_SPLIT_GROCERY, user_msg, max_tokens=4096, model=model)
 
     # ── Phase 4: AI Intelligence Layer ──────────────────────────────
 
-    async def calculate_freshness(self, item: dict, rules: dict | None = None) -> dict:
-        """Assess effective remaining freshness for a single pantry item."""
-        system = (
-            "You are a food safety and freshness expert. Estimate the effective remaining shelf life "
-            "of this food item. Consider: storage method, whether it's been opened, category norms, "
-            "and USDA guidelines. Return JSON:\n"
-            '{"freshness_status": "fresh|use_soon|use_today|expired", '
-            '"effective_expiration_date": "YYYY-MM-DD", '
-            '"confidence": 0.0-1.0, '
-            '"reasoning": "brief explanation", '
-            '"storage_tips": "how to maximize remaining life"}\n'
-            "Return ONLY the JSON."
-        )
+    @staticmethod
+    def _freshness_prompt(item: dict, rules: dict | None = None) -> tuple[str, str]:
+        """System prompt and user message for a single-item freshness estimate."""
         rules_text = ""
         if rules:
             rules_text = (
@@ -372,43 +959,66 @@ class KitchenAI:
             f"- Current quantity: {item.get('quantity', '?')} {item.get('unit', '')}"
             f"{rules_text}\n\nToday's date: {item.get('today', '?')}"
         )
-        text = await self._call_claude(system, user_msg, max_tokens=1024)
-        return _extract_json(text)
+        return _SYS_FRESHNESS, user_msg
 
-    async def check_freshness_batch(self, items: list[dict]) -> list[dict]:
-        """Batch freshness check for multiple items at once."""
-        system = (
-            "You are a food safety expert. Assess freshness for each item in the list. "
-            "Return a JSON array with one entry per item:\n"
-            '[{"item_id": "...", "freshness_status": "fresh|use_soon|use_today|expired", '
-            '"effective_expiration_date": "YYYY-MM-DD", "confidence": 0.0-1.0, '
-            '"reasoning": "brief", "storage_tips": "optional tip"}]\n'
-            "Return ONLY the JSON array."
-        )
-        items_text = "\n".join(
-            f"- ID={i.get('id','?')}: {i.get('name','?')} | cat={i.get('category','?')} | "
-            f"loc={i.get('location','?')} | purchased={i.get('purchase_date','?')} | "
-            f"expires={i.get('expiration_date','none')} | opened={i.get('opened_date','no')} | "
-            f"qty={i.get('quantity','?')} {i.get('unit','')}"
-            for i in items
+    async def calculate_freshness(self, item: dict, rules: dict | None = None) -> dict:
+        """Assess effective remaining freshness for a single pantry item."""
+        system, user_msg = self._freshness_prompt(item, rules)
+        return await self._call_claude_json(system, user_msg, max_tokens=1024, model=self.model_fast, bounded=True)
+
+    async def check_freshness_batch(self, items: list[dict], use_batch_api: bool = False) -> list[dict]:
+        """
+        Freshness check for many items, one concurrent single-item call each.
+
+        With `use_batch_api`, each item becomes its own request on the Message
+        Batches API (half price, no shared output cap) and this waits for the
+        batch to finish, which can take minutes. Meant for background jobs.
+        """
+        if not self.client:
+            raise RuntimeError("Anthropic API key not configured")
+        if use_batch_api:
+            return await self._check_freshness_via_batches(items)
+
+        # One bounded call per item, so a large pantry can't overflow a shared
+        # response and one bad answer doesn't sink the rest
+        answers = await asyncio.gather(
+            *(self.calculate_freshness(item) for item in items), return_exceptions=True
         )
-        user_msg = f"Assess freshness for these items (today's date: {items[0].get('today', '?')}):\n{items_text}"
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        results = []
+        failures = []
+        for item, answer in zip(items, answers):
+            if isinstance(answer, Exception):
+                logger.warning("Freshness check failed for item %s: %r", item.get("id"), answer)
+                failures.append(answer)
+                continue
+            answer["item_id"] = item.get("id")
+            results.append(answer)
+        # Partial failures are tolerated, but an empty result must not look like success
+        if failures and not results:
+            raise failures[0]
+        return results
+
+    async def _check_freshness_via_batches(self, items: list[dict]) -> list[dict]:
+        requests = []
+        for item in items:
+            system, user_msg = self._freshness_prompt(item)
+            requests.append(
+                self._batch_request(item["id"], system, user_msg, max_tokens=1024, model=self.model_fast)
+            )
+        texts = await self.poll_batch(await self.submit_batch(requests))
+
+        results = []
+        for item_id, text in texts.items():
+            try:
+                result = _extract_json(text)
+            except ValueError:
+                continue
+            result["item_id"] = item_id
+            results.append(result)
+        return results
 
     async def suggest_substitutions(self, missing: str, recipe: dict, pantry: list[dict]) -> list[dict]:
         """Suggest substitutions from user's pantry for a missing ingredient."""
-        system = (
-            "You are a culinary substitution expert. The user is missing an ingredient for a recipe. "
-            "Suggest 1-3 substitutions from items they actually have in their pantry. "
-            "Rank by how well they'd work. Include quantity adjustments and technique modifications. "
-            "Return JSON array:\n"
-            '[{"substitute_name": "...", "pantry_item_id": "uuid or null", '
-            '"quantity": number, "unit": "string", '
-            '"confidence": 0.0-1.0, "notes": "technique adjustments", '
-            '"flavor_impact": "brief description of how taste will differ"}]\n'
-            "Return ONLY the JSON array."
-        )
         pantry_summary = "\n".join(
             f"- {p.get('name','?')} (id={p.get('id','?')}, {p.get('quantity','?')} {p.get('unit','')}) [{p.get('category','?')}]"
             for p in pantry[:80]
@@ -421,24 +1031,10 @@ class KitchenAI:
             f"Other ingredients in recipe: {', '.join(i.get('ingredient_name', '?') for i in recipe.get('ingredients', []))}\n\n"
             f"User's pantry:\n{pantry_summary}"
         )
-        text = await self._call_claude(system, user_msg, max_tokens=2048)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_SUBSTITUTIONS, user_msg, max_tokens=2048)
 
     async def analyze_waste(self, waste_logs: list[dict]) -> dict:
         """Analyze waste patterns and suggest improvements."""
-        system = (
-            "You are a food waste reduction expert. Analyze this waste history and provide actionable insights. "
-            "Return JSON:\n"
-            '{"total_items_wasted": integer, "total_estimated_cost": number, '
-            '"most_wasted_items": [{"name": "...", "count": integer, "total_cost": number}], '
-            '"patterns": ["pattern description", ...], '
-            '"recommendations": [{"title": "short title", "description": "actionable suggestion", "priority": "high|medium|low"}], '
-            '"waste_by_reason": {"expired": integer, "spoiled": integer, "forgot": integer, "overcooked": integer, "didnt_like": integer}, '
-            '"waste_by_category": {"produce": number, "dairy": number, ...}, '
-            '"trend": "improving|worsening|stable", '
-            '"monthly_summary": [{"month": "YYYY-MM", "cost": number, "count": integer}]}\n'
-            "Return ONLY the JSON."
-        )
         logs_text = "\n".join(
             f"- {l.get('item_name','?')} | qty={l.get('quantity_wasted','?')} {l.get('unit','')} | "
             f"reason={l.get('reason','?')} | cost=${l.get('estimated_cost',0) or 0:.2f} | "
@@ -447,26 +1043,12 @@ class KitchenAI:
         ) or "No waste logged yet."
 
         user_msg = f"Analyze this waste history ({len(waste_logs)} entries):\n{logs_text}"
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_WASTE_ANALYSIS, user_msg, max_tokens=4096)
 
-    async def what_can_i_make(self, pantry: list[dict], tools: list[dict], preferences: dict) -> list[dict]:
-        """Suggest recipes from current pantry and equipment."""
-        system = (
-            "You are a creative chef. Suggest 5-8 recipes the user can make RIGHT NOW with what they have. "
-            "Prioritize items that need to be used soon (use_today, use_soon freshness). "
-            "Only suggest equipment the user owns. Return JSON array:\n"
-            '[{"name": "Recipe Name", "description": "brief", "difficulty": "easy|medium|hard", '
-            '"total_time_minutes": integer, "uses_expiring": ["item1", "item2"], '
-            '"missing_items": ["item that would be nice but not required"], '
-            '"key_ingredients": ["main items from pantry"], '
-            '"cuisine": "string", "meal_type": "breakfast|lunch|dinner|snack"}]\n'
-            "Return ONLY the JSON array."
-        )
-        pantry_summary = "\n".join(
-            f"- {p.get('name','?')} ({p.get('quantity','?')} {p.get('unit','')}) [{p.get('freshness_status','fresh')}] loc={p.get('location','?')}"
-            for p in pantry[:80]
-        ) or "Pantry is empty."
+    @staticmethod
+    def _what_can_i_make_prompt(pantry: list[dict], tools: list[dict], preferences: dict) -> tuple[str, str]:
+        """System prompt and user message for `what_can_i_make`."""
+        pantry_summary = _compact_pantry(pantry, ("name", "quantity", "unit", "freshness_status", "location"))
 
         tools_summary = "\n".join(
             f"- {t.get('name','?')} ({', '.join(t.get('capabilities', []))})"
@@ -483,93 +1065,72 @@ class KitchenAI:
         if preferences.get("meal_type"):
             pref_lines.append(f"Meal type: {preferences['meal_type']}")
 
-        user_msg = (
-            f"What can I make with these ingredients and tools?\n\n"
+        user_msg = _pantry_message(
+            f"Pantry (prioritize items marked use_today/use_soon):\n{pantry_summary}",
+            f"Equipment:\n{tools_summary}\n\n"
             f"Preferences:\n{chr(10).join(pref_lines) or 'No specific preferences.'}\n\n"
-            f"Pantry (prioritize items marked use_today/use_soon):\n{pantry_summary}\n\n"
-            f"Equipment:\n{tools_summary}"
+            f"What can I make with these ingredients and tools?",
         )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return _SYS_WHAT_CAN_I_MAKE, user_msg
+
+    async def what_can_i_make(self, pantry: list[dict], tools: list[dict], preferences: dict) -> list[dict]:
+        """Suggest recipes from current pantry and equipment."""
+        system, user_msg = self._what_can_i_make_prompt(pantry, tools, preferences)
+        return await self._call_claude_json(system, user_msg, max_tokens=4096)
+
+    async def stream_what_can_i_make(
+        self, pantry: list[dict], tools: list[dict], preferences: dict
+    ) -> AsyncIterator[dict]:
+        """Like `what_can_i_make`, but yields each suggestion as soon as Claude finishes it."""
+        system, user_msg = self._what_can_i_make_prompt(pantry, tools, preferences)
+        async for suggestion in self._stream_json_array(system, user_msg, max_tokens=4096):
+            yield suggestion
 
+    @_cached_response(lambda month, pantry: (month, sorted(p.get("name", "?") for p in pantry[:60])))
     async def seasonal_suggestions(self, month: int, pantry: list[dict]) -> dict:
         """Get seasonal ingredient suggestions and recipe ideas (Michigan-focused)."""
-        month_names = [
-            "", "January", "February", "March", "April", "May", "June",
-            "July", "August", "September", "October", "November", "December"
-        ]
-        system = (
-            "You are a seasonal cooking expert with deep knowledge of Michigan agriculture and seasonality. "
-            "Suggest what's in season and recipe ideas that feature seasonal ingredients. "
-            "Return JSON:\n"
-            '{"month": "Month Name", "in_season": [{"name": "ingredient", "peak": true/false, '
-            '"description": "brief note"}], '
-            '"recipe_ideas": [{"name": "Recipe Name", "description": "brief", "seasonal_ingredients": ["..."], '
-            '"total_time_minutes": integer}], '
-            '"tips": ["seasonal cooking tip", ...], '
-            '"items_user_has_in_season": ["pantry items that are currently in season"]}\n'
-            "Return ONLY the JSON."
-        )
+        if not 1 <= month <= 12:
+            raise ValueError(f"month must be 1-12, got {month}")
         pantry_summary = "\n".join(
             f"- {p.get('name','?')} ({p.get('category','?')})"
             for p in pantry[:60]
         ) or "Pantry is empty."
 
         user_msg = (
-            f"What's in season in Michigan for {month_names[month]}?\n\n"
+            f"What's in season in Michigan for {_MONTH_NAMES[month]}?\n\n"
             f"User's current pantry:\n{pantry_summary}\n\n"
             f"Suggest seasonal ingredients, recipes featuring them, and identify which items "
             f"the user already has that are currently in season."
         )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_SEASONAL, user_msg, max_tokens=4096)
 
     async def pantry_forecast(self, pantry: list[dict], meal_plans: list[dict]) -> dict:
         """Project pantry state after planned meals, highlighting what will run out."""
-        system = (
-            "You are a kitchen inventory analyst. Given the current pantry and upcoming meal plans, "
-            "project what the pantry will look like after all planned meals. "
-            "Return JSON:\n"
-            '{"forecast_date": "YYYY-MM-DD (end of plan period)", '
-            '"items_will_run_out": [{"name": "...", "current_qty": number, "needed_qty": number, "unit": "...", "runs_out_by": "YYYY-MM-DD"}], '
-            '"items_getting_low": [{"name": "...", "current_qty": number, "projected_qty": number, "unit": "..."}], '
-            '"items_untouched": ["items not used in any planned meal"], '
-            '"items_expiring_unused": [{"name": "...", "expires": "YYYY-MM-DD", "not_in_any_plan": true}], '
-            '"shopping_needed": [{"name": "...", "quantity_short": number, "unit": "...", "needed_for": "recipe name"}]}\n'
-            "Return ONLY the JSON."
+        get = dict.get
+        pantry_summary = _compact_pantry(
+            pantry, ("name", "quantity", "unit", "expiration_date", "freshness_status")
         )
-        pantry_summary = "\n".join(
-            f"- {p.get('name','?')} ({p.get('quantity','?')} {p.get('unit','')}) expires={p.get('expiration_date','none')} [{p.get('freshness_status','fresh')}]"
-            for p in pantry[:80]
-        ) or "Pantry is empty."
 
-        plans_summary = "\n".join(
-            f"- {m.get('plan_date','?')} {m.get('meal_type','?')}: {m.get('recipe_name','?')} ({m.get('servings','?')} servings) "
-            f"ingredients: {', '.join(i.get('ingredient_name','?') + '(' + str(i.get('quantity','?')) + ' ' + str(i.get('unit','')) + ')' for i in m.get('ingredients', []))}"
+        plans_summary = "\n".join([
+            "- %s %s: %s (%s servings) ingredients: %s" % (
+                get(m, "plan_date", "?"), get(m, "meal_type", "?"), get(m, "recipe_name", "?"), get(m, "servings", "?"),
+                ", ".join([
+                    "%s(%s %s)" % (get(i, "ingredient_name", "?"), get(i, "quantity", "?"), get(i, "unit", ""))
+                    for i in get(m, "ingredients", [])
+                ]),
+            )
             for m in meal_plans
-        ) or "No upcoming meals planned."
+        ]) or "No upcoming meals planned."
 
-        user_msg = (
-            f"Project pantry state after these planned meals:\n\n"
-            f"Current pantry:\n{pantry_summary}\n\n"
-            f"Upcoming meal plans:\n{plans_summary}"
+        user_msg = _pantry_message(
+            f"Current pantry:\n{pantry_summary}",
+            f"Upcoming meal plans:\n{plans_summary}\n\n"
+            f"Project pantry state after these planned meals.",
         )
-        text = await self._call_claude(system, user_msg, max_tokens=4096)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_PANTRY_FORECAST, user_msg, max_tokens=4096)
 
     async def smart_suggestions(self, context: dict) -> dict:
         """Generate contextual AI suggestions based on the user's current kitchen state."""
-        system = (
-            "You are an intelligent kitchen assistant. Based on the user's current kitchen state, "
-            "generate 3-5 contextual, actionable suggestions. Consider freshness urgency, meal planning gaps, "
-            "seasonal produce, waste patterns, and cooking variety. "
-            "Return JSON:\n"
-            '{"suggestions": [{"type": "freshness|meal_plan|waste|seasonal|variety|efficiency", '
-            '"title": "Short action title", "description": "Detailed actionable suggestion", '
-            '"priority": "high|medium|low", "related_items": ["item names"]}], '
-            '"tip_of_the_day": "A contextual cooking or storage tip"}\n'
-            "Return ONLY the JSON."
-        )
         parts = []
         if context.get("expiring_items"):
             parts.append("Items expiring soon:\n" + "\n".join(
@@ -599,69 +1160,23 @@ class KitchenAI:
             parts.append(f"Current month: {context['current_month']}")
 
         user_msg = "Generate smart suggestions based on this kitchen state:\n\n" + "\n\n".join(parts)
-        text = await self._call_claude(system, user_msg, max_tokens=2048)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_SMART_SUGGESTIONS, user_msg, max_tokens=2048)
 
     # ── Phase 6: Import & Sharing ────────────────────────────────────
 
     async def import_google_doc(self, text: str, doc_type: str = "pantry") -> list[dict]:
         """Parse unstructured text (Google Doc, notes, pasted lists) into structured data."""
-        schemas = {
-            "pantry": (
-                "Extract pantry/inventory items from this text. Return JSON array:\n"
-                '[{"name": "Item Name", "category": "produce|dairy|meat|seafood|grains|canned|condiments|spices|baking|beverages|snacks|frozen|other", '
-                '"quantity": number or null, "unit": "string or null", "brand": "string or null", '
-                '"location": "fridge|freezer|pantry|counter|other", "notes": "string or null"}]\n'
-                "Parse quantities, units, and categories from context. Normalize names. Return ONLY the JSON array."
-            ),
-            "recipes": (
-                "Extract recipe(s) from this text. For each recipe return JSON matching:\n"
-                + RECIPE_JSON_SCHEMA + "\n"
-                "If there are multiple recipes, wrap them in a JSON array. Return ONLY the JSON."
-            ),
-            "tools": (
-                "Extract kitchen tools/equipment from this text. Return JSON array:\n"
-                '[{"name": "Tool Name", "category": "appliance|cookware|bakeware|utensil|knife|gadget|storage|other", '
-                '"brand": "string or null", "capabilities": ["capability1", ...], '
-                '"condition": "excellent|good|fair|poor|needs_repair", "notes": "string or null"}]\n'
-                "Return ONLY the JSON array."
-            ),
-            "grocery": (
-                "Extract grocery/shopping list items from this text. Return JSON array:\n"
-                '[{"item_name": "Item Name", "quantity": number or null, "unit": "string or null", '
-                '"category": "produce|dairy|meat|bakery|frozen|canned|beverages|snacks|household|other", '
-                '"notes": "string or null"}]\n'
-                "Parse quantities and units from context. Return ONLY the JSON array."
-            ),
-        }
-
-        schema = schemas.get(doc_type, schemas["pantry"])
-        system = (
-            f"You are a document parser for kitchen management. "
-            f"Extract structured {doc_type} data from the user's text. "
-            f"The text may be a Google Doc export, pasted notes, a list, or free-form text. "
-            f"Capture every item mentioned. {schema}"
-        )
+        system = _SYS_IMPORT_DOC.get(doc_type) or _import_doc_system(doc_type)
         user_msg = f"Parse the following text into {doc_type} items:\n\n{text}"
-        raw = await self._call_claude(system, user_msg, max_tokens=4096)
-        result = _extract_json(raw)
+        result = await self._call_claude_json(system, user_msg, max_tokens=4096)
         # Ensure we always return a list
         if isinstance(result, dict):
             result = [result]
         return result
 
+    @_cached_response(lambda recipe: recipe)
     async def generate_share_card(self, recipe: dict) -> dict:
         """Generate a concise shareable summary for a recipe."""
-        system = (
-            "You are a recipe content creator. Generate an engaging share card for this recipe. "
-            "Return JSON:\n"
-            '{"title": "Recipe Name", "tagline": "One catchy sentence", '
-            '"highlights": ["3-4 short bullet highlights"], '
-            '"emoji": "single relevant emoji", '
-            '"estimated_difficulty": "easy|medium|hard", '
-            '"estimated_time": "X min"}\n'
-            "Return ONLY the JSON."
-        )
         user_msg = (
             f"Generate a share card for:\n"
             f"Name: {recipe.get('name', '?')}\n"
@@ -671,8 +1186,7 @@ class KitchenAI:
             f"Ingredients: {', '.join(i.get('ingredient_name', '?') for i in recipe.get('ingredients', []))}\n"
             f"Tags: {', '.join(recipe.get('tags', []))}"
         )
-        text = await self._call_claude(system, user_msg, max_tokens=1024)
-        return _extract_json(text)
+        return await self._call_claude_json(_SYS_SHARE_CARD, user_msg, max_tokens=1024, model=self.model_fast)
 
 
 @lru_cache
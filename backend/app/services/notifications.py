@@ -1,88 +1,273 @@
 """
 Notification Service — generates and manages user notifications.
 
-For Phase 4 (web), notifications are stored in-memory and served via API.
+Notifications are served via API from a per-user list, newest first. Each
+one expires after a lifetime set by its type and is dropped when the list is
+next read. With NOTIFICATIONS_REDIS set they live in Redis, so they survive
+restarts and are shared between API processes and Celery workers; otherwise
+they are kept in this process's memory.
 Phase 5 (mobile) will add push notifications via Expo.
 """
 
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta, timezone
 from uuid import uuid4
 
-from sqlalchemy.orm import Session
+import msgspec
+from sqlalchemy.orm import Session, selectinload
 
+from app.config import get_settings
 from app.models.pantry import PantryItem
 from app.models.meal_plan import MealPlan
-from app.models.recipe import Recipe
+from app.models.recipe import Recipe, RecipeIngredient
+from app.utils.cache import TTLCache
 
+try:
+    import redis
+except ImportError:
+    redis = None
 
-# In-memory notification store (per-user)
-# In production, this would be a Redis-backed or DB-backed store.
-_notifications: dict[str, list[dict]] = {}
+logger = logging.getLogger(__name__)
 
+# How long each type of notification stays relevant
+_NOTIFICATION_TTL = {
+    "freshness_alert": timedelta(days=1),
+    "low_stock": timedelta(days=3),
+    "thaw_reminder": timedelta(days=2),
+    "meal_reminder": timedelta(hours=12),
+    "maintenance_reminder": timedelta(days=7),
+}
+_DEFAULT_NOTIFICATION_TTL = timedelta(days=1)
 
-def _add_notification(user_id: str, notif: dict) -> None:
-    """Add a notification to the in-memory store."""
+# Backstop only; expiry normally keeps lists far shorter
+_MAX_NOTIFICATIONS = 200
+# A user's Redis list expires once its longest-lived entry would have
+_REDIS_TTL_SECONDS = int(max(_NOTIFICATION_TTL.values()).total_seconds())
+
+# Dedupe keys include the date, so they only need to outlive the day
+_DEDUPE_TTL_SECONDS = 86400
+
+# In-memory notification store (per-user), used when Redis is not enabled
+_notifications: dict[str, deque[dict]] = {}
+# Dedupe keys already added, per (user, day), so a clear can reset them
+_seen = TTLCache(maxsize=10_000, ttl=_DEDUPE_TTL_SECONDS)
+
+_redis_client = None
+
+
+@dataclass(frozen=True, slots=True)
+class ScanContext:
+    """
+    Clock readings shared by every generator in one scan run, so a nightly
+    fan-out reads the clock once rather than per user and per notification.
+    """
+
+    today: date
+    tomorrow: date
+    day_after: date
+    now: datetime
+    now_iso: str
+
+    @classmethod
+    def current(cls) -> "ScanContext":
+        now = datetime.now(timezone.utc)
+        today = date.today()
+        return cls(
+            today=today,
+            tomorrow=today + timedelta(days=1),
+            day_after=today + timedelta(days=2),
+            now=now,
+            now_iso=now.isoformat(),
+        )
+
+
+def _redis():
+    """Shared Redis client, or None when notifications are kept in memory."""
+    global _redis_client
+    if _redis_client is None and redis is not None:
+        settings = get_settings()
+        if settings.NOTIFICATIONS_REDIS:
+            _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def _redis_key(user_id) -> str:
+    return f"notif:{user_id}"
+
+
+def _redis_load(r, key: str) -> list[dict]:
+    return [msgspec.json.decode(raw) for raw in r.lrange(key, 0, -1)]
+
+
+def _is_expired(notif: dict, now: str) -> bool:
+    # Both sides are UTC isoformat() strings, which sort chronologically
+    expires_at = notif.get("expires_at")
+    return expires_at is not None and expires_at <= now
+
+
+def _dedupe_key(notif: dict, day: str) -> str:
+    """
+    Identifies a notification about the same thing on the same day. Severity
+    is part of it, so an item escalating from use-soon to expired still alerts.
+    """
+    subject = ":".join(notif.get(k, "") for k in ("item_id", "tool_id", "meal_plan_id"))
+    return f"{notif['type']}:{notif.get('severity', '')}:{subject}:{day}"
+
+
+def _add_notifications(user_id: str, notifs: list[dict], ctx: ScanContext | None = None) -> None:
+    """
+    Add a batch of notifications to the store, skipping any already added for
+    the same subject today (e.g. when a scan is re-run).
+    """
+    if not notifs:
+        return
     uid = str(user_id)
-    if uid not in _notifications:
-        _notifications[uid] = []
-    notif["id"] = str(uuid4())
-    notif["created_at"] = datetime.now(timezone.utc).isoformat()
-    notif["read"] = False
-    _notifications[uid].insert(0, notif)
-    # Keep max 50 notifications per user
-    _notifications[uid] = _notifications[uid][:50]
+    ctx = ctx or ScanContext.current()
+    day = ctx.today.isoformat()
+    keys = [_dedupe_key(n, day) for n in notifs]
+
+    r = _redis()
+    if r is not None:
+        with r.pipeline() as pipe:
+            for k in keys:
+                pipe.set(f"notif_seen:{uid}:{k}", 1, ex=_DEDUPE_TTL_SECONDS, nx=True)
+            is_new = pipe.execute()
+        notifs = [n for n, new in zip(notifs, is_new) if new]
+    else:
+        seen = _seen.get((uid, day))
+        if seen is None:
+            seen = set()
+            _seen.set((uid, day), seen)
+        fresh = []
+        for n, k in zip(notifs, keys):
+            if k not in seen:
+                seen.add(k)
+                fresh.append(n)
+        notifs = fresh
+    if not notifs:
+        return
+
+    for notif in notifs:
+        notif["id"] = str(uuid4())
+        notif["created_at"] = ctx.now_iso
+        notif["expires_at"] = (ctx.now + _NOTIFICATION_TTL.get(notif["type"], _DEFAULT_NOTIFICATION_TTL)).isoformat()
+        notif["read"] = False
+
+    if r is not None:
+        key = _redis_key(uid)
+        with r.pipeline() as pipe:
+            # LPUSH puts the last value at the head, matching appendleft order
+            pipe.lpush(key, *(msgspec.json.encode(n) for n in notifs))
+            pipe.ltrim(key, 0, _MAX_NOTIFICATIONS - 1)
+            pipe.expire(key, _REDIS_TTL_SECONDS)
+            pipe.execute()
+        return
+
+    store = _notifications.get(uid)
+    if store is None:
+        store = _notifications[uid] = deque(maxlen=_MAX_NOTIFICATIONS)
+    store.extendleft(notifs)
 
 
 def get_notifications(user_id: str, unread_only: bool = False) -> list[dict]:
     """Get notifications for a user."""
     uid = str(user_id)
-    notifs = _notifications.get(uid, [])
+    now = datetime.now(timezone.utc).isoformat()
+    r = _redis()
+    if r is not None:
+        key = _redis_key(uid)
+        raws = r.lrange(key, 0, -1)
+        notifs = [msgspec.json.decode(raw) for raw in raws]
+        expired = [raw for raw, n in zip(raws, notifs) if _is_expired(n, now)]
+        if expired:
+            # LREM by value, so entries pushed since the LRANGE are untouched
+            with r.pipeline() as pipe:
+                for raw in expired:
+                    pipe.lrem(key, 1, raw)
+                pipe.execute()
+            notifs = [n for n in notifs if not _is_expired(n, now)]
+    else:
+        notifs = _notifications.get(uid, ())
+        if any(_is_expired(n, now) for n in notifs):
+            notifs = _notifications[uid] = deque(
+                (n for n in notifs if not _is_expired(n, now)), maxlen=_MAX_NOTIFICATIONS,
+            )
     if unread_only:
         return [n for n in notifs if not n.get("read")]
-    return notifs
+    return list(notifs)
 
 
-def mark_read(user_id: str, notification_id: str) -> bool:
-    """Mark a notification as read."""
+def _mark(user_id: str, should_mark) -> int:
+    """Set read=True on each notification `should_mark` accepts. Returns count marked."""
     uid = str(user_id)
-    for n in _notifications.get(uid, []):
-        if n["id"] == notification_id:
+    r = _redis()
+    if r is None:
+        count = 0
+        for n in _notifications.get(uid, ()):
+            if should_mark(n):
+                n["read"] = True
+                count += 1
+        return count
+
+    def mark(pipe) -> int:
+        # Reads run immediately while the key is WATCHed; a push or trim
+        # before EXEC shifts the positions, so the transaction is retried
+        marked = [(i, n) for i, n in enumerate(_redis_load(pipe, key)) if should_mark(n)]
+        pipe.multi()
+        for i, n in marked:
             n["read"] = True
-            return True
-    return False
+            pipe.lset(key, i, msgspec.json.encode(n))
+        return len(marked)
+
+    key = _redis_key(uid)
+    return r.transaction(mark, key, value_from_callable=True)
+
+
+def mark_read(user_id: str, notification_id: str) -> bool:
+    """Mark a notification as read."""
+    return _mark(user_id, lambda n: n["id"] == notification_id) > 0
 
 
 def mark_all_read(user_id: str) -> int:
     """Mark all notifications as read. Returns count marked."""
-    uid = str(user_id)
-    count = 0
-    for n in _notifications.get(uid, []):
-        if not n.get("read"):
-            n["read"] = True
-            count += 1
-    return count
+    return _mark(user_id, lambda n: not n.get("read"))
 
 
 def clear_notifications(user_id: str) -> None:
-    """Clear all notifications for a user."""
-    _notifications[str(user_id)] = []
+    """Clear all notifications for a user, so the next scan can alert again."""
+    uid = str(user_id)
+    r = _redis()
+    if r is not None:
+        r.delete(_redis_key(uid), *r.scan_iter(match=f"notif_seen:{uid}:*"))
+    else:
+        _notifications.pop(uid, None)
+        _seen.pop((uid, ScanContext.current().today.isoformat()), None)
 
 
-def generate_freshness_alerts(db: Session, user_id) -> list[dict]:
+def generate_freshness_alerts(db: Session, user_id, ctx: ScanContext | None = None) -> list[dict]:
     """
     Generate freshness alert notifications for items that need attention.
     Called by the daily freshness scan or on-demand.
     """
-    today = date.today()
     alerts = []
 
-    # Items expiring today
-    use_today_items = db.query(PantryItem).filter(
+    # One query for all three statuses, bucketed so alerts keep their
+    # use-today / use-soon / expired order
+    by_status: dict[str, list] = {"use_today": [], "use_soon": [], "expired": []}
+    rows = db.query(
+        PantryItem.id, PantryItem.name, PantryItem.quantity, PantryItem.unit,
+        PantryItem.freshness_status,
+    ).filter(
         PantryItem.user_id == user_id,
-        PantryItem.freshness_status == "use_today",
-    ).all()
+        PantryItem.freshness_status.in_(by_status.keys()),
+    )
+    for row in rows:
+        by_status[row.freshness_status].append(row)
 
-    for item in use_today_items:
+    # Items expiring today
+    for item in by_status["use_today"]:
         notif = {
             "type": "freshness_alert",
             "severity": "high",
@@ -92,16 +277,10 @@ def generate_freshness_alerts(db: Session, user_id) -> list[dict]:
             "action_type": "view_recipes",
             "action_label": "Find recipes",
         }
-        _add_notification(str(user_id), notif)
         alerts.append(notif)
 
     # Items expiring soon
-    use_soon_items = db.query(PantryItem).filter(
-        PantryItem.user_id == user_id,
-        PantryItem.freshness_status == "use_soon",
-    ).all()
-
-    for item in use_soon_items:
+    for item in by_status["use_soon"]:
         notif = {
             "type": "freshness_alert",
             "severity": "medium",
@@ -111,16 +290,10 @@ def generate_freshness_alerts(db: Session, user_id) -> list[dict]:
             "action_type": "view_item",
             "action_label": "View item",
         }
-        _add_notification(str(user_id), notif)
         alerts.append(notif)
 
     # Expired items
-    expired_items = db.query(PantryItem).filter(
-        PantryItem.user_id == user_id,
-        PantryItem.freshness_status == "expired",
-    ).all()
-
-    for item in expired_items:
+    for item in by_status["expired"]:
         notif = {
             "type": "freshness_alert",
             "severity": "critical",
@@ -130,17 +303,20 @@ def generate_freshness_alerts(db: Session, user_id) -> list[dict]:
             "action_type": "log_waste",
             "action_label": "Log waste",
         }
-        _add_notification(str(user_id), notif)
         alerts.append(notif)
 
+    _add_notifications(user_id, alerts, ctx)
     return alerts
 
 
-def generate_low_stock_alerts(db: Session, user_id) -> list[dict]:
+def generate_low_stock_alerts(db: Session, user_id, ctx: ScanContext | None = None) -> list[dict]:
     """Generate low stock notifications for staple items."""
     alerts = []
 
-    low_items = db.query(PantryItem).filter(
+    low_items = db.query(
+        PantryItem.id, PantryItem.name, PantryItem.quantity, PantryItem.unit,
+        PantryItem.min_quantity,
+    ).filter(
         PantryItem.user_id == user_id,
         PantryItem.is_staple == True,
         PantryItem.min_quantity.isnot(None),
@@ -157,50 +333,65 @@ def generate_low_stock_alerts(db: Session, user_id) -> list[dict]:
             "action_type": "add_to_grocery",
             "action_label": "Add to grocery list",
         }
-        _add_notification(str(user_id), notif)
         alerts.append(notif)
 
+    _add_notifications(user_id, alerts, ctx)
     return alerts
 
 
-def generate_thaw_reminders(db: Session, user_id) -> list[dict]:
+def generate_thaw_reminders(db: Session, user_id, ctx: ScanContext | None = None) -> list[dict]:
     """
     Generate thaw reminders for upcoming meals with frozen ingredients.
     Checks meals 24-48 hours out for frozen ingredients.
     """
-    today = date.today()
-    tomorrow = today + timedelta(days=1)
-    day_after = today + timedelta(days=2)
+    ctx = ctx or ScanContext.current()
     alerts = []
 
     # Get meals planned for tomorrow and day after
     upcoming_meals = db.query(MealPlan).filter(
         MealPlan.user_id == user_id,
-        MealPlan.plan_date.between(tomorrow, day_after),
+        MealPlan.plan_date.between(ctx.tomorrow, ctx.day_after),
         MealPlan.completed == False,
         MealPlan.recipe_id.isnot(None),
         MealPlan.thaw_reminder_sent == False,
     ).all()
 
+    # Load the recipes, their ingredients and the matching freezer items in
+    # three queries instead of one round-trip per meal and ingredient
+    recipe_ids = {meal.recipe_id for meal in upcoming_meals}
+    recipe_names = dict(
+        db.query(Recipe.id, Recipe.name).filter(Recipe.id.in_(recipe_ids)).all()
+    ) if recipe_ids else {}
+
+    ingredient_names: dict = defaultdict(list)
+    if recipe_names:
+        rows = db.query(RecipeIngredient.recipe_id, RecipeIngredient.canonical_name).filter(
+            RecipeIngredient.recipe_id.in_(recipe_names.keys()),
+            RecipeIngredient.canonical_name.isnot(None),
+        )
+        for recipe_id, canonical_name in rows:
+            if canonical_name:
+                ingredient_names[recipe_id].append(canonical_name)
+
+    all_names = {name for names in ingredient_names.values() for name in names}
+    frozen_by_name: dict = {}
+    if all_names:
+        frozen_items = db.query(PantryItem.id, PantryItem.name, PantryItem.canonical_name).filter(
+            PantryItem.user_id == user_id,
+            PantryItem.canonical_name.in_(all_names),
+            PantryItem.location == "freezer",
+        )
+        for item in frozen_items:
+            frozen_by_name.setdefault(item.canonical_name, item)
+
     for meal in upcoming_meals:
-        recipe = db.query(Recipe).filter(Recipe.id == meal.recipe_id).first()
-        if not recipe:
+        recipe_name = recipe_names.get(meal.recipe_id)
+        if recipe_name is None:
             continue
 
         # Check if any recipe ingredients are frozen in pantry
-        from app.models.recipe import RecipeIngredient
-        ingredients = db.query(RecipeIngredient).filter(
-            RecipeIngredient.recipe_id == recipe.id,
-        ).all()
-
-        for ing in ingredients:
-            if not ing.canonical_name:
-                continue
-            frozen_item = db.query(PantryItem).filter(
-                PantryItem.user_id == user_id,
-                PantryItem.canonical_name == ing.canonical_name,
-                PantryItem.location == "freezer",
-            ).first()
+        for canonical_name in ingredient_names.get(meal.recipe_id, ()):
+            frozen_item = frozen_by_name.get(canonical_name)
 
             if frozen_item:
                 notif = {
@@ -209,39 +400,38 @@ def generate_thaw_reminders(db: Session, user_id) -> list[dict]:
                     "title": f"Thaw reminder: {frozen_item.name}",
                     "message": (
                         f"Move {frozen_item.name} to the fridge tonight for "
-                        f"{meal.plan_date.strftime('%A')}'s {meal.meal_type}: {recipe.name}"
+                        f"{meal.plan_date.strftime('%A')}'s {meal.meal_type}: {recipe_name}"
                     ),
                     "item_id": str(frozen_item.id),
                     "meal_plan_id": str(meal.id),
                     "action_type": "view_meal",
                     "action_label": "View meal",
                 }
-                _add_notification(str(user_id), notif)
                 alerts.append(notif)
 
         # Mark reminder as sent
         meal.thaw_reminder_sent = True
 
     db.commit()
+    _add_notifications(user_id, alerts, ctx)
     return alerts
 
 
-def generate_meal_reminders(db: Session, user_id) -> list[dict]:
+def generate_meal_reminders(db: Session, user_id, ctx: ScanContext | None = None) -> list[dict]:
     """Generate reminders for today's upcoming meals."""
-    today = date.today()
+    ctx = ctx or ScanContext.current()
     alerts = []
 
-    todays_meals = db.query(MealPlan).filter(
+    todays_meals = db.query(MealPlan).options(
+        selectinload(MealPlan.recipe).load_only(Recipe.name),
+    ).filter(
         MealPlan.user_id == user_id,
-        MealPlan.plan_date == today,
+        MealPlan.plan_date == ctx.today,
         MealPlan.completed == False,
     ).all()
 
     for meal in todays_meals:
-        recipe_name = meal.custom_meal or "a meal"
-        if meal.recipe_id:
-            recipe = db.query(Recipe).filter(Recipe.id == meal.recipe_id).first()
-            recipe_name = recipe.name if recipe else recipe_name
+        recipe_name = meal.recipe.name if meal.recipe else (meal.custom_meal or "a meal")
 
         notif = {
             "type": "meal_reminder",
@@ -252,37 +442,40 @@ def generate_meal_reminders(db: Session, user_id) -> list[dict]:
             "action_type": "view_meal",
             "action_label": "View meal",
         }
-        _add_notification(str(user_id), notif)
         alerts.append(notif)
 
+    _add_notifications(user_id, alerts, ctx)
     return alerts
 
 
-def generate_maintenance_reminders(db: Session, user_id) -> list[dict]:
+def generate_maintenance_reminders(db: Session, user_id, ctx: ScanContext | None = None) -> list[dict]:
     """Generate maintenance reminders for kitchen tools."""
     from app.models.tool import KitchenTool
-    today = date.today()
+    ctx = ctx or ScanContext.current()
     alerts = []
 
-    tools = db.query(KitchenTool).filter(
+    # Postgres date + integer adds days, so only due tools leave the database
+    next_maintenance = KitchenTool.last_maintained + KitchenTool.maintenance_interval_days
+    tools = db.query(
+        KitchenTool.id, KitchenTool.name, KitchenTool.maintenance_type,
+    ).filter(
         KitchenTool.user_id == user_id,
         KitchenTool.maintenance_interval_days.isnot(None),
         KitchenTool.last_maintained.isnot(None),
+        next_maintenance <= ctx.today + timedelta(days=3),
     ).all()
 
     for tool in tools:
-        next_maintenance = tool.last_maintained + timedelta(days=tool.maintenance_interval_days)
-        if next_maintenance <= today + timedelta(days=3):
-            notif = {
-                "type": "maintenance_reminder",
-                "severity": "low",
-                "title": f"Maintenance due: {tool.name}",
-                "message": f"Time to {tool.maintenance_type or 'maintain'} your {tool.name}.",
-                "tool_id": str(tool.id),
-                "action_type": "view_tool",
-                "action_label": "View tool",
-            }
-            _add_notification(str(user_id), notif)
-            alerts.append(notif)
+        notif = {
+            "type": "maintenance_reminder",
+            "severity": "low",
+            "title": f"Maintenance due: {tool.name}",
+            "message": f"Time to {tool.maintenance_type or 'maintain'} your {tool.name}.",
+            "tool_id": str(tool.id),
+            "action_type": "view_tool",
+            "action_label": "View tool",
+        }
+        alerts.append(notif)
 
+    _add_notifications(user_id, alerts, ctx)
     return alerts
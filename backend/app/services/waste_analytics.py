@@ -4,14 +4,27 @@ Waste Analytics — analyzes waste patterns and generates insights.
 Combines database aggregation with AI analysis for actionable recommendations.
 """
 
+import copy
 from datetime import date, timedelta
-from collections import defaultdict
 
-from sqlalchemy import func, extract
+from sqlalchemy import case, extract, func
 from sqlalchemy.orm import Session
 
 from app.models.waste import WasteLog
 from app.models.pantry import PantryItem
+from app.utils.cache import TTLCache
+
+# Summaries are keyed on a fingerprint of the user's logs (row count and
+# latest write), read with one cheap query per request. Any worker's write
+# changes the key for every process, so no cross-worker invalidation is needed.
+_summary_cache = TTLCache(maxsize=1024, ttl=300)
+
+
+def _waste_fingerprint(db: Session, user_id) -> tuple:
+    count, latest = db.query(func.count(WasteLog.id), func.max(WasteLog.updated_at)).filter(
+        WasteLog.user_id == user_id,
+    ).one()
+    return count, latest
 
 
 def get_waste_summary(db: Session, user_id, days: int = 90) -> dict:
@@ -19,14 +32,22 @@ def get_waste_summary(db: Session, user_id, days: int = 90) -> dict:
     Get waste statistics from the database for a user.
     Returns aggregated data suitable for charts and the AI analyzer.
     """
+    key = (str(user_id), days, date.today(), _waste_fingerprint(db, user_id))
+    summary = _summary_cache.get(key)
+    if summary is None:
+        summary = _build_waste_summary(db, user_id, days)
+        _summary_cache.set(key, summary)
+    return copy.deepcopy(summary)
+
+
+def _build_waste_summary(db: Session, user_id, days: int) -> dict:
     cutoff = date.today() - timedelta(days=days)
+    in_window = (WasteLog.user_id == user_id, WasteLog.wasted_date >= cutoff)
+    cost = func.coalesce(WasteLog.estimated_cost, 0.0)
 
-    logs = db.query(WasteLog).filter(
-        WasteLog.user_id == user_id,
-        WasteLog.wasted_date >= cutoff,
-    ).order_by(WasteLog.wasted_date.desc()).all()
+    total_items, total_cost = db.query(func.count(WasteLog.id), func.sum(cost)).filter(*in_window).one()
 
-    if not logs:
+    if not total_items:
         return {
             "total_items": 0,
             "total_cost": 0.0,
@@ -37,50 +58,54 @@ def get_waste_summary(db: Session, user_id, days: int = 90) -> dict:
             "logs": [],
         }
 
-    total_cost = sum(l.estimated_cost or 0 for l in logs)
-
     # Group by reason
-    by_reason: dict[str, int] = defaultdict(int)
-    for l in logs:
-        by_reason[l.reason or "unknown"] += 1
+    reason = func.coalesce(WasteLog.reason, "unknown")
+    by_reason = dict(
+        db.query(reason, func.count(WasteLog.id)).filter(*in_window).group_by(reason).all()
+    )
 
     # Group by month
-    monthly: dict[str, dict] = defaultdict(lambda: {"cost": 0.0, "count": 0})
-    for l in logs:
-        if l.wasted_date:
-            key = l.wasted_date.strftime("%Y-%m")
-            monthly[key]["cost"] += l.estimated_cost or 0
-            monthly[key]["count"] += 1
+    year = extract("year", WasteLog.wasted_date)
+    month = extract("month", WasteLog.wasted_date)
+    monthly_rows = db.query(year, month, func.sum(cost), func.count(WasteLog.id)).filter(
+        *in_window,
+    ).group_by(year, month).order_by(year, month).all()
 
     monthly_list = [
-        {"month": k, "cost": round(v["cost"], 2), "count": v["count"]}
-        for k, v in sorted(monthly.items())
+        {"month": f"{int(y):04d}-{int(m):02d}", "cost": round(c, 2), "count": n}
+        for y, m, c, n in monthly_rows
     ]
 
     # Most wasted items (by frequency)
-    item_counts: dict[str, dict] = defaultdict(lambda: {"count": 0, "total_cost": 0.0})
-    for l in logs:
-        name = l.item_name or "Unknown"
-        item_counts[name]["count"] += 1
-        item_counts[name]["total_cost"] += l.estimated_cost or 0
-
-    most_wasted = sorted(
-        [{"name": k, **v} for k, v in item_counts.items()],
-        key=lambda x: x["count"],
-        reverse=True,
-    )[:10]
+    name = func.coalesce(WasteLog.item_name, "Unknown")
+    item_rows = db.query(name, func.count(WasteLog.id), func.sum(cost)).filter(
+        *in_window,
+    ).group_by(name).order_by(
+        func.count(WasteLog.id).desc(), func.max(WasteLog.wasted_date).desc(),
+    ).limit(10).all()
+
+    most_wasted = [{"name": n, "count": c, "total_cost": t} for n, c, t in item_rows]
 
     # By category (join with pantry if possible)
-    by_category: dict[str, float] = defaultdict(float)
-    for l in logs:
-        if l.pantry_item_id:
-            item = db.query(PantryItem).filter(PantryItem.id == l.pantry_item_id).first()
-            cat = item.category if item else "unknown"
-        else:
-            cat = "unknown"
-        by_category[cat] += l.estimated_cost or 0
+    category = case((PantryItem.id.is_(None), "unknown"), else_=PantryItem.category)
+    by_category = dict(
+        db.query(category, func.sum(cost))
+        .select_from(WasteLog)
+        .outerjoin(PantryItem, PantryItem.id == WasteLog.pantry_item_id)
+        .filter(*in_window)
+        .group_by(category)
+        .all()
+    )
 
     # Serialize logs for AI analysis
+    log_rows = db.query(
+        WasteLog.item_name, WasteLog.quantity_wasted, WasteLog.unit, WasteLog.reason,
+        WasteLog.estimated_cost, WasteLog.wasted_date,
+        func.coalesce(PantryItem.category, "unknown").label("category"),
+    ).outerjoin(
+        PantryItem, PantryItem.id == WasteLog.pantry_item_id,
+    ).filter(*in_window).order_by(WasteLog.wasted_date.desc())
+
     logs_data = [
         {
             "item_name": l.item_name,
@@ -89,15 +114,15 @@ def get_waste_summary(db: Session, user_id, days: int = 90) -> dict:
             "reason": l.reason,
             "estimated_cost": l.estimated_cost,
             "wasted_date": str(l.wasted_date) if l.wasted_date else None,
-            "category": by_category.get(l.item_name, "unknown") if isinstance(by_category.get(l.item_name), str) else "unknown",
+            "category": l.category,
         }
-        for l in logs
+        for l in log_rows
     ]
 
     return {
-        "total_items": len(logs),
-        "total_cost": round(total_cost, 2),
-        "by_reason": dict(by_reason),
+        "total_items": total_items,
+        "total_cost": round(total_cost or 0, 2),
+        "by_reason": by_reason,
         "by_category": {k: round(v, 2) for k, v in by_category.items()},
         "most_wasted": most_wasted,
         "monthly": monthly_list,
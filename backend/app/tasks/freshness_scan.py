@@ -3,7 +3,7 @@ Background tasks for freshness scanning.
 
 These can be triggered via:
   1. Celery beat (nightly scheduled scan)
-  2. On-demand via API endpoint
+  2. On-demand via API endpoint (queued when CELERY_ENABLED is set)
   3. When an item is marked as opened
 
 When Celery/Redis is not available, the scan runs synchronously via the API.
@@ -11,13 +11,18 @@ When Celery/Redis is not available, the scan runs synchronously via the API.
 
 import asyncio
 import logging
-from datetime import datetime, timezone
+from collections.abc import AsyncIterator
+from uuid import UUID
 
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
 from app.database import SessionLocal
 from app.models.user import User
 from app.services.freshness import run_freshness_scan, update_item_freshness
-from app.services.kitchen_ai import get_kitchen_ai
+from app.services.kitchen_ai import KitchenAI, get_kitchen_ai
 from app.services.notifications import (
+    ScanContext,
     generate_freshness_alerts,
     generate_low_stock_alerts,
     generate_thaw_reminders,
@@ -28,74 +33,187 @@ from app.services.notifications import (
 logger = logging.getLogger(__name__)
 
 
-async def _run_nightly_scan_for_user(user_id) -> dict:
-    """Run the full nightly scan for a single user."""
-    db = SessionLocal()
+def _generate_nightly_notifications(db: Session, user_id, ctx: ScanContext) -> dict:
+    """Generate all notification types. Returns how many of each were generated."""
+    freshness_alerts = generate_freshness_alerts(db, user_id, ctx)
+    low_stock_alerts = generate_low_stock_alerts(db, user_id, ctx)
+    thaw_reminders = generate_thaw_reminders(db, user_id, ctx)
+    meal_reminders = generate_meal_reminders(db, user_id, ctx)
+    maintenance_reminders = generate_maintenance_reminders(db, user_id, ctx)
+
+    return {
+        "freshness_alerts": len(freshness_alerts),
+        "low_stock_alerts": len(low_stock_alerts),
+        "thaw_reminders": len(thaw_reminders),
+        "meal_reminders": len(meal_reminders),
+        "maintenance_reminders": len(maintenance_reminders),
+    }
+
+
+async def _scan_user(db: Session, user_id, ctx: ScanContext | None = None) -> dict:
+    """Run the full nightly scan for a single user on an existing session."""
+    ctx = ctx or ScanContext.current()
     try:
         ai = get_kitchen_ai()
 
-        # 1. Run freshness scan
-        scan_result = await run_freshness_scan(db, user_id, ai=ai)
+        # 1. Run freshness scan. Nobody is waiting on the nightly run, so
+        # unknown items go through the half-price Message Batches API.
+        scan_result = await run_freshness_scan(db, user_id, ai=ai, use_batch_api=True)
 
-        # 2. Generate all notification types
-        freshness_alerts = generate_freshness_alerts(db, user_id)
-        low_stock_alerts = generate_low_stock_alerts(db, user_id)
-        thaw_reminders = generate_thaw_reminders(db, user_id)
-        meal_reminders = generate_meal_reminders(db, user_id)
-        maintenance_reminders = generate_maintenance_reminders(db, user_id)
+        # 2. Generate all notification types. Pure database work, so it runs
+        # in a thread while other users' scans wait on Claude.
+        notifications = await asyncio.to_thread(_generate_nightly_notifications, db, user_id, ctx)
 
         return {
             "user_id": str(user_id),
             "scan": scan_result,
-            "notifications": {
-                "freshness_alerts": len(freshness_alerts),
-                "low_stock_alerts": len(low_stock_alerts),
-                "thaw_reminders": len(thaw_reminders),
-                "meal_reminders": len(meal_reminders),
-                "maintenance_reminders": len(maintenance_reminders),
-            },
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "notifications": notifications,
+            "timestamp": ctx.now_iso,
         }
     except Exception as e:
+        # The session may be reused for the next user
+        db.rollback()
         logger.error(f"Freshness scan failed for user {user_id}: {e}")
         return {"user_id": str(user_id), "error": str(e)}
+
+
+async def _run_nightly_scan_for_user(user_id) -> dict:
+    """Run the full nightly scan for a single user."""
+    with SessionLocal() as db:
+        return await _scan_user(db, user_id)
+
+
+async def iter_nightly_scan() -> AsyncIterator[dict]:
+    """Run the nightly freshness scan for ALL users, yielding each user's result as it finishes."""
+    with SessionLocal() as db:
+        user_ids = [uid for (uid,) in db.query(User.id)]
+    ctx = ScanContext.current()
+
+    # Users are independent, so overlap their Claude round-trips. Each worker
+    # keeps one session (and pooled connection) for all the users it scans,
+    # and hands results over as they finish; None marks a worker exiting.
+    results: asyncio.Queue[dict | None] = asyncio.Queue()
+    pending = iter(user_ids)
+    workers = min(len(user_ids), max(1, get_settings().NIGHTLY_SCAN_CONCURRENCY))
+
+    async def _worker() -> None:
+        try:
+            with SessionLocal() as db:
+                for uid in pending:
+                    results.put_nowait(await _scan_user(db, uid, ctx))
+        finally:
+            results.put_nowait(None)
+
+    tasks = [asyncio.create_task(_worker()) for _ in range(workers)]
+    try:
+        running = workers
+        while running:
+            result = await results.get()
+            if result is None:
+                running -= 1
+                continue
+            logger.info(f"Scanned user {result['user_id']}: {result.get('scan', {}).get('items_changed', 0)} items changed")
+            yield result
+        # Re-raises anything a worker hit outside _scan_user's own handling
+        await asyncio.gather(*tasks)
     finally:
-        db.close()
+        # Stops the workers if the consumer gives up early
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_nightly_scan_all_users() -> dict:
+    """
+    Run the nightly freshness scan for ALL users. Called by Celery beat or manually.
+    Returns aggregate counts; per-user results are only logged.
+    """
+    stats = {"users": 0, "failed": 0, "items_changed": 0}
+    async for result in iter_nightly_scan():
+        stats["users"] += 1
+        if "error" in result:
+            stats["failed"] += 1
+        else:
+            stats["items_changed"] += result["scan"].get("items_changed", 0)
+    return stats
+
+
+def _generate_scan_notifications(db: Session, user_id) -> dict:
+    """Alerts a freshness scan can trigger. Returns how many of each were generated."""
+    ctx = ScanContext.current()
+    freshness_alerts = generate_freshness_alerts(db, user_id, ctx)
+    low_stock_alerts = generate_low_stock_alerts(db, user_id, ctx)
+    thaw_reminders = generate_thaw_reminders(db, user_id, ctx)
+
+    return {
+        "freshness": len(freshness_alerts),
+        "low_stock": len(low_stock_alerts),
+        "thaw": len(thaw_reminders),
+    }
 
 
-async def run_nightly_scan_all_users() -> list[dict]:
-    """Run the nightly freshness scan for ALL users. Called by Celery beat or manually."""
+def generate_scan_notifications(user_id) -> None:
+    """Background-task entry point: generate scan alerts on a fresh session."""
+    with SessionLocal() as db:
+        try:
+            _generate_scan_notifications(db, user_id)
+        except Exception as e:
+            logger.error(f"Scan notifications failed for user {user_id}: {e}")
+
+
+async def run_on_demand_scan(db: Session, user_id, ai: KitchenAI | None = None) -> dict:
+    """Freshness scan plus the alerts it can trigger, as run by the queued on-demand task."""
+    scan_result = await run_freshness_scan(db, user_id, ai=ai)
+
+    return {
+        "scan": scan_result,
+        "notifications_generated": _generate_scan_notifications(db, user_id),
+    }
+
+
+def _run_in_new_loop(coro):
+    """
+    asyncio.run() `coro` for a sync caller, then close the Claude client.
+
+    The shared client is bound to this run's loop, so its pooled connections
+    are closed here instead of being left open once the loop is gone.
+    """
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await get_kitchen_ai().aclose()
+
+    return asyncio.run(_main())
+
+
+def sync_run_on_demand_scan(user_id: str, force_ai: bool = False) -> dict:
+    """Synchronous wrapper for the queued on-demand scan."""
     db = SessionLocal()
     try:
-        users = db.query(User).all()
-        user_ids = [u.id for u in users]
+        ai = get_kitchen_ai() if force_ai else None
+        result = _run_in_new_loop(run_on_demand_scan(db, UUID(user_id), ai=ai))
+        # Lets the polling endpoint check the task belongs to the caller
+        result["user_id"] = user_id
+        return result
     finally:
         db.close()
 
-    results = []
-    for uid in user_ids:
-        result = await _run_nightly_scan_for_user(uid)
-        results.append(result)
-        logger.info(f"Scanned user {uid}: {result.get('scan', {}).get('items_changed', 0)} items changed")
 
-    return results
-
-
-def sync_run_nightly_scan() -> list[dict]:
+def sync_run_nightly_scan() -> dict:
     """Synchronous wrapper for Celery task."""
-    return asyncio.run(run_nightly_scan_all_users())
+    return _run_in_new_loop(run_nightly_scan_all_users())
 
 
 def sync_run_user_scan(user_id) -> dict:
     """Synchronous wrapper for single-user scan."""
-    return asyncio.run(_run_nightly_scan_for_user(user_id))
+    return _run_in_new_loop(_run_nightly_scan_for_user(user_id))
 
 
 # ── Celery task definitions (optional, only if Celery is configured) ──
 
 try:
     from celery import Celery
-    from app.config import get_settings
 
     settings = get_settings()
     celery_app = Celery(
@@ -114,6 +232,11 @@ try:
         """Celery task: run freshness scan for a specific user."""
         return sync_run_user_scan(user_id)
 
+    @celery_app.task(name="freshness_scan.on_demand")
+    def celery_on_demand_scan(user_id: str, force_ai: bool = False):
+        """Celery task: on-demand freshness scan + alerts for one user."""
+        return sync_run_on_demand_scan(user_id, force_ai)
+
     # Beat schedule: run nightly at 2 AM
     celery_app.conf.beat_schedule = {
         "nightly-freshness-scan": {
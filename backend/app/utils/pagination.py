@@ -1,4 +1,10 @@
-from fastapi import Query
+import base64
+from uuid import UUID
+
+import msgspec
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
+from sqlalchemy import and_, or_
 
 
 def pagination_params(
@@ -12,3 +18,79 @@ def paginate(query, skip: int, limit: int):
     total = query.count()
     items = query.offset(skip).limit(limit).all()
     return {"items": items, "total": total, "skip": skip, "limit": limit}
+
+
+def paginate_structs(query, skip: int, limit: int, struct_type, batch_size: int = 50) -> Response:
+    """
+    Paginate a column query straight into msgspec structs and encode the page.
+
+    The query must select columns in `struct_type` field order (see
+    `app.schemas._fast.struct_columns`). Rows are streamed with `yield_per`
+    so SQLAlchemy's result buffer stays bounded.
+    """
+    total = query.count()
+    rows = query.offset(skip).limit(limit).yield_per(batch_size)
+    items = [struct_type(*row) for row in rows]
+    body = {"items": items, "total": total, "skip": skip, "limit": limit}
+    return Response(content=msgspec.json.encode(body), media_type="application/json")
+
+
+def _keyset_order(sort_col, id_col, descending: bool = False) -> tuple:
+    """
+    Total order used by keyset pages: `sort_col` with NULLs last, then the
+    primary key as a tie-breaker so every row has a unique position.
+    """
+    if descending:
+        return sort_col.desc().nulls_last(), id_col.desc()
+    return sort_col.asc().nulls_last(), id_col.asc()
+
+
+def _encode_cursor(value, row_id) -> str:
+    return base64.urlsafe_b64encode(msgspec.json.encode([value, row_id])).decode()
+
+
+def _decode_cursor(cursor: str, sort_col) -> tuple:
+    try:
+        value, row_id = msgspec.json.decode(base64.urlsafe_b64decode(cursor.encode()))
+        if value is not None:
+            value = msgspec.convert(value, sort_col.type.python_type)
+        return value, msgspec.convert(row_id, UUID)
+    except (ValueError, TypeError, msgspec.DecodeError, msgspec.ValidationError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate_structs_keyset(
+    query, sort_col, id_col, descending: bool, cursor: str | None, limit: int, struct_type,
+) -> Response:
+    """
+    Keyset (seek) variant of `paginate_structs`.
+
+    Instead of counting the whole result and skipping `skip` rows, each page
+    starts right after the (sort value, id) of the previous page's last row,
+    carried in the opaque `next_cursor` (null on the last page). An empty
+    `cursor` requests the first page. The query must not be ordered yet;
+    rows come back in `_keyset_order(sort_col, id_col, descending)`.
+    """
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort_col)
+        past_id = id_col < last_id if descending else id_col > last_id
+        if value is None:
+            query = query.filter(sort_col.is_(None), past_id)
+        else:
+            past = sort_col < value if descending else sort_col > value
+            query = query.filter(or_(past, and_(sort_col == value, past_id), sort_col.is_(None)))
+
+    n_fields = len(struct_type.__struct_fields__)
+    rows = (
+        query.add_columns(sort_col, id_col)
+        .order_by(*_keyset_order(sort_col, id_col, descending))
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][n_fields], rows[-1][n_fields + 1])
+    items = [struct_type(*row[:n_fields]) for row in rows]
+    body = {"items": items, "next_cursor": next_cursor, "limit": limit}
+    return Response(content=msgspec.json.encode(body), media_type="application/json")
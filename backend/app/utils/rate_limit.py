@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio callers: holds up to `capacity` tokens and
+    refills at `capacity / period` per second. `acquire(n)` waits until n
+    tokens are available. Not bound to an event loop, so one bucket can be
+    shared across the loops of successive asyncio.run() calls.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # A request larger than the bucket waits for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        while True:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return
+            await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def block_for(self, seconds: float) -> None:
+        """Hold every caller for `seconds`, e.g. after the server returned retry-after."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
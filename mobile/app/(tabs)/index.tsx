@@ -56,6 +56,19 @@ interface SmartSuggestionsResponse {
 
 /* ── Helpers ────────────────────────────────────────────────────── */
 
+/** Run a freshness scan, waiting for it when the server queued it on a worker. */
+async function runFreshnessScan(): Promise<void> {
+  const res = await api.post<{ task_id?: string }>("/ai/freshness-scan");
+  if (!res.task_id) return;
+  for (let attempt = 0; attempt < 60; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, 2000));
+    const { status } = await api.get<{ status: string }>(`/ai/freshness-scan/${res.task_id}`);
+    if (status === "success") return;
+    if (status === "failure") throw new Error("Freshness scan failed");
+  }
+  throw new Error("Freshness scan timed out");
+}
+
 function getTodayISO(): string {
   return new Date().toISOString().split("T")[0];
 }
@@ -136,7 +149,7 @@ export default function DashboardScreen() {
   /* ── Mutations ────────────────────────────────────────────── */
 
   const scanMut = useMutation({
-    mutationFn: () => api.post("/ai/freshness-scan"),
+    mutationFn: runFreshnessScan,
     onSuccess: () => {
       freshnessQ.refetch();
     },
@@ -59,6 +59,19 @@ interface MealPlanEntry {
   recipe_id?: string;
 }
 
+/** Run a freshness scan, waiting for it when the server queued it on a worker. */
+async function runFreshnessScan(): Promise<void> {
+  const res = await api.post<{ task_id?: string }>("/ai/freshness-scan");
+  if (!res.task_id) return;
+  for (let attempt = 0; attempt < 60; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, 2000));
+    const { status } = await api.get<{ status: string }>(`/ai/freshness-scan/${res.task_id}`);
+    if (status === "success") return;
+    if (status === "failure") throw new Error("Freshness scan failed");
+  }
+  throw new Error("Freshness scan timed out");
+}
+
 export default function DashboardPage() {
   const { isAuthenticated, isLoading, user } = useAuthStore();
   const router = useRouter();
@@ -145,7 +158,7 @@ export default function DashboardPage() {
 
   /* ── Freshness Scan ───────────────────────────────────────── */
   const scanMut = useMutation({
-    mutationFn: () => api.post("/ai/freshness-scan"),
+    mutationFn: runFreshnessScan,
     onSuccess: () => {
       freshnessQ.refetch();
     },